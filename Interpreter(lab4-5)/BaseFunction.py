@@ -1,7 +1,7 @@
 from Context import Context
 from Errors import RTError
 from RTResult import RTResult
-from SymbolTable import SymbolTable
+from SymbolTable import SymbolTable, SlottedSymbolTable
 from Value import Value
 
 
@@ -10,9 +10,14 @@ class BaseFunction(Value):
         super().__init__()
         self.name = name or "<anonymous>"
 
-    def generate_new_context(self):
+    def generate_new_context(self, layout=None):
         new_context = Context(self.name, self.context, self.start_position)
-        new_context.symbol_table = SymbolTable(new_context.parent.symbol_table)
+
+        if layout:
+            new_context.symbol_table = SlottedSymbolTable(new_context.parent.symbol_table, layout)
+        else:
+            new_context.symbol_table = SymbolTable(new_context.parent.symbol_table)
+
         return new_context
 
     def check_arguments(self, arguments_names, arguments):
@@ -38,7 +43,6 @@ class BaseFunction(Value):
         for i in range(len(arguments)):
             arguments_name = arguments_names[i]
             arguments_value = arguments[i]
-            arguments_value.set_context(exec_ctx)
             exec_ctx.symbol_table.set(arguments_name, arguments_value)
 
     def check_and_populate_arguments(self, arguments_names, arguments, exec_ctx):
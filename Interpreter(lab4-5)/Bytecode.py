@@ -0,0 +1,108 @@
+#######################################
+# OPCODES
+#######################################
+
+LOAD_CONST = 0
+LOAD_LOCAL = 1
+STORE_LOCAL = 2
+LOAD_NAME = 3
+STORE_NAME = 4
+POP = 5
+BINARY_OPERATION = 6
+UNARY_NEGATIVE = 7
+UNARY_NOT = 8
+BUILD_LIST = 9
+JUMP = 10
+POP_JUMP_IF_FALSE = 11
+FOR_PREPARE = 12
+FOR_ITERATE = 13
+RESULTS_INIT = 14
+RESULTS_APPEND = 15
+RESULTS_LOAD = 16
+MAKE_FUNCTION = 17
+CALL = 18
+RETURN = 19
+UNWIND_LOOP = 20
+
+OPCODE_NAMES = {
+    LOAD_CONST: 'LOAD_CONST',
+    LOAD_LOCAL: 'LOAD_LOCAL',
+    STORE_LOCAL: 'STORE_LOCAL',
+    LOAD_NAME: 'LOAD_NAME',
+    STORE_NAME: 'STORE_NAME',
+    POP: 'POP',
+    BINARY_OPERATION: 'BINARY_OPERATION',
+    UNARY_NEGATIVE: 'UNARY_NEGATIVE',
+    UNARY_NOT: 'UNARY_NOT',
+    BUILD_LIST: 'BUILD_LIST',
+    JUMP: 'JUMP',
+    POP_JUMP_IF_FALSE: 'POP_JUMP_IF_FALSE',
+    FOR_PREPARE: 'FOR_PREPARE',
+    FOR_ITERATE: 'FOR_ITERATE',
+    RESULTS_INIT: 'RESULTS_INIT',
+    RESULTS_APPEND: 'RESULTS_APPEND',
+    RESULTS_LOAD: 'RESULTS_LOAD',
+    MAKE_FUNCTION: 'MAKE_FUNCTION',
+    CALL: 'CALL',
+    RETURN: 'RETURN',
+    UNWIND_LOOP: 'UNWIND_LOOP',
+}
+
+# FOR_ITERATE carries the jump target of the loop exit as a third word
+INSTRUCTION_SIZES = {FOR_ITERATE: 3}
+
+# UNWIND_LOOP arguments
+UNWIND_BREAK = 0
+UNWIND_CONTINUE = 1
+
+#######################################
+# CODE OBJECT
+#######################################
+
+class CodeObject:
+    def __init__(self, name, arguments_names=None, should_auto_return=False, body_node=None):
+        self.name = name
+        self.arguments_names = arguments_names or []
+        self.should_auto_return = should_auto_return
+        self.body_node = body_node
+
+        self.instructions = []
+        self.constants = []
+        self.nodes = {}
+
+        # CALL position inside a loop to (break target, continue target, stack depth),
+        # where a BREAK or CONTINUE leaving the callee resumes
+        self.loop_handlers = {}
+
+        self.local_names = list(self.arguments_names)
+        self.local_index = {name: slot for slot, name in enumerate(self.local_names)}
+        self.local_count = len(self.local_names)
+
+    def add_local(self, name):
+        if name not in self.local_index:
+            self.local_index[name] = self.local_count
+            self.local_names.append(name)
+            self.local_count += 1
+
+        return self.local_index[name]
+
+    def add_hidden_slots(self, count):
+        slot = self.local_count
+        self.local_count += count
+        return slot
+
+    def disassemble(self):
+        lines = []
+        pc = 0
+
+        while pc < len(self.instructions):
+            op = self.instructions[pc]
+            size = INSTRUCTION_SIZES.get(op, 2)
+            arguments = ' '.join(str(argument) for argument in self.instructions[pc + 1:pc + size])
+            lines.append(f'{pc:>5} {OPCODE_NAMES[op]:<18} {arguments}')
+            pc += size
+
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return f'<code {self.name}>'
@@ -0,0 +1,439 @@
+from BaseFunction import BaseFunction
+from Context import Context
+from Errors import RTError
+from LazyList import lazy_loop
+from List import List
+from Nodes import ListNode
+from Number import Number, make_number, loop_range, is_loop_entered
+from Operations import OP_DIV, OPERATION_METHODS, NUMBER_OPERATIONS, operation_error, negation_error
+from RTResult import RTResult
+from Signals import ErrorSignal, ReturnSignal, BreakSignal, ContinueSignal
+from String import String
+from SymbolTable import SymbolTable
+
+MINUS = 'MINUS'
+
+
+class ClosureFunction(BaseFunction):
+    def __init__(self, name, body, arguments_names, should_auto_return, body_node=None):
+        super().__init__(name)
+        self.body = body
+        self.arguments_names = arguments_names
+        self.should_auto_return = should_auto_return
+        self.body_node = body_node
+
+    def call(self, arguments, context, entry_position):
+        execute_context = Context(self.name, context, entry_position)
+        execute_context.symbol_table = SymbolTable(context.symbol_table)
+
+        for arguments_name, arguments_value in zip(self.arguments_names, arguments):
+            execute_context.symbol_table.set(arguments_name, arguments_value)
+
+        try:
+            value = self.body(execute_context)
+        except ReturnSignal as signal:
+            return signal.value
+
+        return value if self.should_auto_return else Number.null
+
+    def execute(self, arguments):
+        res = RTResult()
+
+        res.register(self.check_arguments(self.arguments_names, arguments))
+
+        if res.should_return():
+            return res
+
+        try:
+            return res.success(self.call(arguments, self.context, self.start_position))
+        except ErrorSignal as signal:
+            return res.failure(signal.error)
+        except BreakSignal:
+            return res.success_break()
+        except ContinueSignal:
+            return res.success_continue()
+
+    def copy(self):
+        copy = ClosureFunction(self.name, self.body, self.arguments_names, self.should_auto_return, self.body_node)
+        copy.set_context(self.context)
+        copy.set_position(self.start_position, self.end_position)
+
+        return copy
+
+    def __repr__(self):
+        return f"<function {self.name}>"
+
+
+class ClosureCompiler:
+    def compile(self, node):
+        return self.visit_method(node)
+
+    def run(self, node, context):
+        res = RTResult()
+        program = self.compile(node)
+
+        try:
+            return res.success(program(context))
+        except ErrorSignal as signal:
+            return res.failure(signal.error)
+        except (ReturnSignal, BreakSignal, ContinueSignal):
+            return res.success(None)
+
+    def discard(self, node):
+        # A block whose value nobody reads does not need to be collected into a List
+        if not isinstance(node, ListNode):
+            return self.visit_method(node)
+
+        statements = [self.discard(element_node) for element_node in node.nodes]
+
+        def block(context):
+            for statement in statements:
+                statement(context)
+
+            return Number.null
+
+        return block
+
+    def loop_prelude(self, node):
+        # Computes the loop's hoisted invariants, False if the original body has to run instead
+        if not node.hoisted_nodes:
+            return None
+
+        statements = [self.visit_method(hoisted_node) for hoisted_node in node.hoisted_nodes]
+
+        def enter_loop(context):
+            try:
+                for statement in statements:
+                    statement(context)
+            except Exception:
+                return False
+
+            return True
+
+        return enter_loop
+
+    def loop_epilogue(self, node):
+        # Removes the invariants of a loop outside any function from the global table
+        hoisted_names = node.hoisted_names
+
+        if not hoisted_names:
+            return None
+
+        def leave_loop(context):
+            for name in hoisted_names:
+                context.symbol_table.symbols.pop(name, None)
+
+        return leave_loop
+
+    ###################################
+
+    def visit_method(self, node):
+        method_name = f'visit_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_visit_method)
+
+        return method(node)
+
+    def no_visit_method(self, node):
+        raise Exception(f'No visit_{type(node).__name__} method defined')
+
+    ###################################
+
+    def visit_ListNode(self, node):
+        elements = [self.visit_method(element_node) for element_node in node.nodes]
+
+        def list_expression(context):
+            return List([element(context) for element in elements])
+
+        return list_expression
+
+    def visit_BinaryOperationNode(self, node):
+        left_operand = self.visit_method(node.left_node)
+        right_operand = self.visit_method(node.right_node)
+        operation = node.operation
+        method_name = OPERATION_METHODS[operation]
+        number_operation = NUMBER_OPERATIONS[operation]
+        checks_zero = operation == OP_DIV
+        cache = node.cache
+
+        def binary_operation(context):
+            left = left_operand(context)
+            right = right_operand(context)
+
+            if type(left) is Number and type(right) is Number and not (checks_zero and right.value == 0):
+                return make_number(number_operation(left.value, right.value))
+
+            if type(left) is cache.left_type and type(right) is cache.right_type:
+                result, error = cache.handler(left, right)
+            else:
+                result, error = cache.miss(left, right)
+
+            if error:
+                raise ErrorSignal(operation_error(node, context, method_name, left, right))
+
+            return result
+
+        return binary_operation
+
+    def visit_UnaryOperationNode(self, node):
+        operand = self.visit_method(node.node)
+
+        if node.op_token.type != MINUS:
+            def not_operation(context):
+                result, _ = operand(context).notted()
+                return result
+
+            return not_operation
+
+        def negative_operation(context):
+            value = operand(context)
+
+            if type(value) is Number:
+                return make_number(-value.value)
+
+            result, error = value.multed_by(Number(-1))
+
+            if error:
+                raise ErrorSignal(negation_error(node, context, value))
+
+            return result
+
+        return negative_operation
+
+    def visit_NumberNode(self, node):
+        value = node.value
+
+        return lambda context: value
+
+    def visit_StringNode(self, node):
+        value = String(node.token.value)
+
+        return lambda context: value
+
+    def visit_VarAccessNode(self, node):
+        var_name = node.var_name_token.value
+
+        def var_access(context):
+            value = context.symbol_table.get(var_name)
+
+            if value is None:
+                raise ErrorSignal(RTError(
+                    node.start_position, node.end_position,
+                    f"'{var_name}' is not defined",
+                    context
+                ))
+
+            return value
+
+        return var_access
+
+    def visit_VarAssignNode(self, node):
+        var_name = node.var_name_token.value
+        value_expression = self.visit_method(node.value_node)
+
+        def var_assign(context):
+            value = value_expression(context)
+            context.symbol_table.set(var_name, value)
+            return value
+
+        return var_assign
+
+    def visit_IfNode(self, node):
+        cases = [
+            (self.visit_method(condition), self.discard(expr) if should_return_null else self.visit_method(expr),
+             should_return_null)
+            for condition, expr, should_return_null in node.cases
+        ]
+
+        if node.else_case:
+            expr, else_should_return_null = node.else_case
+            else_expression = self.discard(expr) if else_should_return_null else self.visit_method(expr)
+        else:
+            else_expression, else_should_return_null = None, True
+
+        def if_expression(context):
+            for condition, expression, should_return_null in cases:
+                if condition(context).is_true():
+                    value = expression(context)
+                    return Number.null if should_return_null else value
+
+            if else_expression:
+                value = else_expression(context)
+                return Number.null if else_should_return_null else value
+
+            return Number.null
+
+        return if_expression
+
+    def visit_WhileNode(self, node):
+        should_return_null = node.should_return_null
+        compile_body = self.discard if should_return_null else self.visit_method
+        original_loop = (self.visit_method(node.condition_node), compile_body(node.body_node))
+        enter_loop = self.loop_prelude(node)
+        leave_loop = self.loop_epilogue(node)
+
+        if enter_loop:
+            hoisted_loop = (self.visit_method(node.hoisted_condition), compile_body(node.hoisted_body))
+
+        def while_expression(context):
+            elements = []
+            condition, body = original_loop
+            is_true = condition(context).is_true()
+
+            # The invariants are computed once the condition lets the body run
+            if is_true and enter_loop and enter_loop(context):
+                condition, body = hoisted_loop
+
+            try:
+                while is_true:
+                    try:
+                        value = body(context)
+                    except ContinueSignal:
+                        pass
+                    except BreakSignal:
+                        break
+                    else:
+                        if not should_return_null:
+                            elements.append(value)
+
+                    is_true = condition(context).is_true()
+
+                return Number.null if should_return_null else List(elements)
+            finally:
+                if leave_loop:
+                    leave_loop(context)
+
+        return while_expression
+
+    def visit_ForNode(self, node):
+        var_name = node.var_name_token.value
+        start_expression = self.visit_method(node.start_value_node)
+        end_expression = self.visit_method(node.end_value_node)
+        step_expression = self.visit_method(node.step_value_node) if node.step_value_node else None
+        should_return_null = node.should_return_null
+        compile_body = self.discard if should_return_null else self.visit_method
+        original_body = compile_body(node.body_node)
+        enter_loop = self.loop_prelude(node)
+        leave_loop = self.loop_epilogue(node)
+        hoisted_body = compile_body(node.hoisted_body) if enter_loop else None
+
+        def for_expression(context):
+            elements = []
+            symbol_table = context.symbol_table
+
+            start_value = start_expression(context)
+            end_value = end_expression(context)
+            step = step_expression(context).value if step_expression else 1
+
+            counter = loop_range(start_value.value, end_value.value, step)
+            lazy_list = None if should_return_null else lazy_loop(node, counter, symbol_table)
+
+            if lazy_list is not None:
+                if counter:
+                    symbol_table.set(var_name, make_number(counter[-1]))
+
+                return lazy_list
+
+            # The invariants are computed only for a loop that makes a pass
+            is_entered = enter_loop and is_loop_entered(start_value.value, end_value.value, step)
+            body = hoisted_body if is_entered and enter_loop(context) else original_body
+
+            try:
+                for i in counter:
+                    symbol_table.set(var_name, make_number(i))
+
+                    try:
+                        value = body(context)
+                    except ContinueSignal:
+                        continue
+                    except BreakSignal:
+                        break
+
+                    if not should_return_null:
+                        elements.append(value)
+
+                return Number.null if should_return_null else List(elements)
+            finally:
+                if leave_loop:
+                    leave_loop(context)
+
+        return for_expression
+
+    def visit_ContinueNode(self, node):
+        def continue_statement(context):
+            raise ContinueSignal()
+
+        return continue_statement
+
+    def visit_BreakNode(self, node):
+        def break_statement(context):
+            raise BreakSignal()
+
+        return break_statement
+
+    def visit_FuncDefinitionNode(self, node):
+        func_name = node.var_name_token.value if node.var_name_token else None
+        arguments_names = [arguments_name.value for arguments_name in node.arguments_name_tokens]
+        should_auto_return = node.should_auto_return
+        body = self.visit_method(node.body_node) if should_auto_return else self.discard(node.body_node)
+
+        def func_definition(context):
+            func_value = ClosureFunction(func_name, body, arguments_names, should_auto_return, node.body_node)
+            func_value.set_context(context).set_position(node.start_position, node.end_position)
+
+            if func_name:
+                context.symbol_table.set(func_name, func_value)
+
+            return func_value
+
+        return func_definition
+
+    def visit_CallNode(self, node):
+        callee = self.visit_method(node.node_to_call)
+        argument_expressions = [self.visit_method(arguments_node) for arguments_node in node.arguments_nodes]
+
+        tree_function = self.tree_function
+
+        def call(context):
+            value_to_call = callee(context)
+            arguments = [argument(context) for argument in argument_expressions]
+
+            if type(value_to_call) is ClosureFunction and len(arguments) == len(value_to_call.arguments_names):
+                return value_to_call.call(arguments, context, node.start_position)
+
+            # A tree-walked function called from a body compiled on tier-up
+            if type(value_to_call) is tree_function and len(arguments) == len(value_to_call.arguments_names):
+                value_to_call.set_position(node.start_position, node.end_position).set_context(context)
+                return value_to_call.call(arguments)
+
+            value_to_call = value_to_call.copy().set_position(node.start_position, node.end_position)
+            value_to_call.set_context(context)
+            res = value_to_call.execute(arguments)
+
+            if res.error:
+                raise ErrorSignal(res.error)
+            if res.loop_should_break:
+                raise BreakSignal()
+            if res.loop_should_continue:
+                raise ContinueSignal()
+
+            return res.value
+
+        return call
+
+    def visit_ReturnNode(self, node):
+        if not node.node_to_return:
+            def return_null(context):
+                raise ReturnSignal(Number.null)
+
+            return return_null
+
+        expression = self.visit_method(node.node_to_return)
+
+        def return_statement(context):
+            raise ReturnSignal(expression(context))
+
+        return return_statement
+
+
+# Function class of the tree walker, set by the Interpreter module
+ClosureCompiler.tree_function = None
@@ -0,0 +1,365 @@
+from Bytecode import CodeObject, LOAD_CONST, LOAD_LOCAL, STORE_LOCAL, LOAD_NAME, STORE_NAME, POP, \
+    BINARY_OPERATION, UNARY_NEGATIVE, UNARY_NOT, BUILD_LIST, JUMP, POP_JUMP_IF_FALSE, FOR_PREPARE, FOR_ITERATE, \
+    RESULTS_INIT, RESULTS_APPEND, RESULTS_LOAD, MAKE_FUNCTION, CALL, RETURN, UNWIND_LOOP, UNWIND_BREAK, UNWIND_CONTINUE
+from Nodes import ListNode
+from Number import Number
+from Resolver import collect_assigned_names
+from String import String
+
+MINUS = 'MINUS'
+
+# Effect of every opcode on the height of the value stack
+STACK_EFFECTS = {
+    LOAD_CONST: 1,
+    LOAD_LOCAL: 1,
+    STORE_LOCAL: 0,
+    LOAD_NAME: 1,
+    STORE_NAME: 0,
+    BINARY_OPERATION: -1,
+    UNARY_NEGATIVE: 0,
+    UNARY_NOT: 0,
+    JUMP: 0,
+    POP_JUMP_IF_FALSE: -1,
+    FOR_PREPARE: -3,
+    FOR_ITERATE: 1,
+    RESULTS_INIT: 0,
+    RESULTS_APPEND: -1,
+    RESULTS_LOAD: 1,
+    MAKE_FUNCTION: 1,
+    RETURN: -1,
+    UNWIND_LOOP: 0,
+}
+
+
+class Loop:
+    def __init__(self, continue_target, depth):
+        self.continue_target = continue_target
+        self.depth = depth
+        self.break_jumps = []
+        self.calls = []
+
+
+class Compiler:
+    def __init__(self, code=None):
+        self.code = code or CodeObject('<program>')
+        self.is_function = code is not None
+        self.depth = 0
+        self.loops = []
+        self.constant_index = {}
+
+    def compile(self, node):
+        self.visit_method(node)
+        self.emit(RETURN)
+
+        return self.code
+
+    def compile_function(self, name, body_node, arguments_names, should_auto_return):
+        code = CodeObject(name, arguments_names, should_auto_return, body_node)
+
+        for local_name in collect_assigned_names(body_node):
+            code.add_local(local_name)
+
+        compiler = Compiler(code)
+
+        if should_auto_return:
+            compiler.visit_method(body_node)
+        else:
+            compiler.discard(body_node)
+            compiler.emit(LOAD_CONST, compiler.constant(Number.null))
+
+        compiler.emit(RETURN)
+
+        return code
+
+    ###################################
+
+    def emit(self, op, argument=0, node=None):
+        position = len(self.code.instructions)
+        self.code.instructions.extend((op, argument))
+
+        if node is not None:
+            self.code.nodes[position] = node
+
+        if op == POP:
+            self.depth -= argument
+        elif op == BUILD_LIST:
+            self.depth += 1 - argument
+        elif op == CALL:
+            self.depth -= argument
+        else:
+            self.depth += STACK_EFFECTS[op]
+
+        return position
+
+    def emit_jump(self, op, target=0):
+        return self.emit(op, target) + 1
+
+    def patch(self, position, target=None):
+        self.code.instructions[position] = len(self.code.instructions) if target is None else target
+
+    def constant(self, value):
+        key = (type(value), type(value.value), value.value) if hasattr(value, 'value') else id(value)
+
+        if key not in self.constant_index:
+            self.constant_index[key] = len(self.code.constants)
+            self.code.constants.append(value)
+
+        return self.constant_index[key]
+
+    def name(self, name):
+        key = ('name', name)
+
+        if key not in self.constant_index:
+            self.constant_index[key] = len(self.code.constants)
+            self.code.constants.append(name)
+
+        return self.constant_index[key]
+
+    def load_variable(self, name, node):
+        slot = self.code.local_index.get(name)
+
+        if slot is None:
+            self.emit(LOAD_NAME, self.name(name), node)
+        else:
+            self.emit(LOAD_LOCAL, slot, node)
+
+    def store_variable(self, name):
+        slot = self.code.local_index.get(name)
+
+        if slot is None:
+            self.emit(STORE_NAME, self.name(name))
+        else:
+            self.emit(STORE_LOCAL, slot)
+
+    def discard(self, node):
+        # A block whose value nobody reads does not need to be collected into a List
+        if isinstance(node, ListNode):
+            for element_node in node.nodes:
+                self.discard(element_node)
+        else:
+            self.visit_method(node)
+            self.emit(POP, 1)
+
+    def leave_loop_body(self, loop):
+        if self.depth > loop.depth:
+            self.emit(POP, self.depth - loop.depth)
+
+    def finish_loop(self, loop):
+        break_target = len(self.code.instructions)
+
+        for break_jump in loop.break_jumps:
+            self.patch(break_jump, break_target)
+
+        for call in loop.calls:
+            self.code.loop_handlers[call] = (break_target, loop.continue_target, loop.depth)
+
+    def unwind_loop(self, kind):
+        # BREAK or CONTINUE outside any loop of this body leaves it for a loop of a caller
+        depth = self.depth
+        self.emit(UNWIND_LOOP, kind)
+        self.depth = depth + 1
+
+    ###################################
+
+    def visit_method(self, node):
+        method_name = f'visit_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_visit_method)
+
+        return method(node)
+
+    def no_visit_method(self, node):
+        raise Exception(f'No visit_{type(node).__name__} method defined')
+
+    ###################################
+
+    def visit_ListNode(self, node):
+        for element_node in node.nodes:
+            self.visit_method(element_node)
+
+        self.emit(BUILD_LIST, len(node.nodes))
+
+    def visit_NumberNode(self, node):
+        self.emit(LOAD_CONST, self.constant(node.value))
+
+    def visit_StringNode(self, node):
+        self.emit(LOAD_CONST, self.constant(String(node.token.value)))
+
+    def visit_BinaryOperationNode(self, node):
+        self.visit_method(node.left_node)
+        self.visit_method(node.right_node)
+
+        self.emit(BINARY_OPERATION, node.operation, node)
+
+    def visit_UnaryOperationNode(self, node):
+        self.visit_method(node.node)
+
+        if node.op_token.type == MINUS:
+            self.emit(UNARY_NEGATIVE, 0, node)
+        else:
+            self.emit(UNARY_NOT, 0, node)
+
+    def visit_VarAccessNode(self, node):
+        self.load_variable(node.var_name_token.value, node)
+
+    def visit_VarAssignNode(self, node):
+        self.visit_method(node.value_node)
+        self.store_variable(node.var_name_token.value)
+
+    def visit_IfNode(self, node):
+        end_jumps = []
+
+        for condition, expr, should_return_null in node.cases:
+            self.visit_method(condition)
+            next_case_jump = self.emit_jump(POP_JUMP_IF_FALSE)
+
+            if should_return_null:
+                self.discard(expr)
+                self.emit(LOAD_CONST, self.constant(Number.null))
+            else:
+                self.visit_method(expr)
+
+            end_jumps.append(self.emit_jump(JUMP))
+            self.depth -= 1
+            self.patch(next_case_jump)
+
+        if node.else_case:
+            expr, should_return_null = node.else_case
+
+            if should_return_null:
+                self.discard(expr)
+                self.emit(LOAD_CONST, self.constant(Number.null))
+            else:
+                self.visit_method(expr)
+        else:
+            self.emit(LOAD_CONST, self.constant(Number.null))
+
+        for end_jump in end_jumps:
+            self.patch(end_jump)
+
+    def visit_WhileNode(self, node):
+        if not node.should_return_null:
+            results_slot = self.code.add_hidden_slots(1)
+            self.emit(RESULTS_INIT, results_slot)
+
+        loop = Loop(len(self.code.instructions), self.depth)
+        self.visit_method(node.condition_node)
+        exit_jump = self.emit_jump(POP_JUMP_IF_FALSE)
+
+        self.loops.append(loop)
+
+        if node.should_return_null:
+            self.discard(node.body_node)
+        else:
+            self.visit_method(node.body_node)
+            self.emit(RESULTS_APPEND, results_slot)
+
+        self.loops.pop()
+
+        self.emit(JUMP, loop.continue_target)
+        self.patch(exit_jump)
+        self.finish_loop(loop)
+
+        if node.should_return_null:
+            self.emit(LOAD_CONST, self.constant(Number.null))
+        else:
+            self.emit(RESULTS_LOAD, results_slot, node)
+
+    def visit_ForNode(self, node):
+        self.visit_method(node.start_value_node)
+        self.visit_method(node.end_value_node)
+
+        if node.step_value_node:
+            self.visit_method(node.step_value_node)
+        else:
+            self.emit(LOAD_CONST, self.constant(Number(1)))
+
+        counter_slot = self.code.add_hidden_slots(3)
+        self.emit(FOR_PREPARE, counter_slot)
+
+        if not node.should_return_null:
+            results_slot = self.code.add_hidden_slots(1)
+            self.emit(RESULTS_INIT, results_slot)
+
+        loop = Loop(len(self.code.instructions), self.depth)
+        self.emit(FOR_ITERATE, counter_slot)
+        self.code.instructions.append(0)
+        exit_jump = len(self.code.instructions) - 1
+
+        self.store_variable(node.var_name_token.value)
+        self.emit(POP, 1)
+
+        self.loops.append(loop)
+
+        if node.should_return_null:
+            self.discard(node.body_node)
+        else:
+            self.visit_method(node.body_node)
+            self.emit(RESULTS_APPEND, results_slot)
+
+        self.loops.pop()
+
+        self.emit(JUMP, loop.continue_target)
+        self.patch(exit_jump)
+        self.finish_loop(loop)
+
+        if node.should_return_null:
+            self.emit(LOAD_CONST, self.constant(Number.null))
+        else:
+            self.emit(RESULTS_LOAD, results_slot, node)
+
+    def visit_ContinueNode(self, node):
+        if not self.loops:
+            return self.unwind_loop(UNWIND_CONTINUE)
+
+        loop = self.loops[-1]
+        depth = self.depth
+        self.leave_loop_body(loop)
+        self.emit(JUMP, loop.continue_target)
+        self.depth = depth + 1
+
+    def visit_BreakNode(self, node):
+        if not self.loops:
+            return self.unwind_loop(UNWIND_BREAK)
+
+        loop = self.loops[-1]
+        depth = self.depth
+        self.leave_loop_body(loop)
+        loop.break_jumps.append(self.emit_jump(JUMP))
+        self.depth = depth + 1
+
+    def visit_FuncDefinitionNode(self, node):
+        func_name = node.var_name_token.value if node.var_name_token else None
+        arguments_names = [arguments_name.value for arguments_name in node.arguments_name_tokens]
+        code = self.compile_function(func_name, node.body_node, arguments_names, node.should_auto_return)
+
+        self.emit(MAKE_FUNCTION, self.constant(code), node)
+
+        if node.var_name_token:
+            self.store_variable(func_name)
+
+    def visit_CallNode(self, node):
+        self.visit_method(node.node_to_call)
+
+        for arguments_node in node.arguments_nodes:
+            self.visit_method(arguments_node)
+
+        position = self.emit(CALL, len(node.arguments_nodes), node)
+
+        if self.loops:
+            self.loops[-1].calls.append(position)
+
+    def visit_ReturnNode(self, node):
+        depth = self.depth
+        node_to_return = node.node_to_return
+
+        if node_to_return and self.is_function:
+            self.visit_method(node_to_return)
+        else:
+            if node_to_return:
+                self.discard(node_to_return)
+
+            # The program itself has no return value, only functions do
+            self.emit(LOAD_CONST, self.constant(Number.null if self.is_function else None))
+
+        self.emit(RETURN)
+        self.depth = depth + 1
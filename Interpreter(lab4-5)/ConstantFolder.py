@@ -0,0 +1,234 @@
+from Nodes import NumberNode, StringNode
+from Number import Number
+from Operations import OP_MUL, OP_POW
+from Resolver import child_nodes
+from String import String
+from Token import Token
+
+INT = 'INT'
+FLOAT = 'FLOAT'
+STRING = 'STRING'
+MINUS = 'MINUS'
+
+# Globals that hold a constant unless a script rebinds them
+CONSTANT_NAMES = ('NULL', 'FALSE', 'TRUE', 'MATH_PI')
+
+
+def collect_names(node, bound_names, read_names):
+    # Every name the program binds or reads, function bodies included
+    node_type = type(node).__name__
+
+    if node_type in ('VarAssignNode', 'ForNode', 'FuncDefinitionNode') and node.var_name_token:
+        bound_names.add(node.var_name_token.value)
+
+    if node_type == 'VarAccessNode':
+        read_names.add(node.var_name_token.value)
+
+    if node_type == 'FuncDefinitionNode':
+        bound_names.update(arguments_name.value for arguments_name in node.arguments_name_tokens)
+        collect_names(node.body_node, bound_names, read_names)
+
+    for child in child_nodes(node):
+        collect_names(child, bound_names, read_names)
+
+
+class ConstantFolder:
+    # Replaces operations on constants with their result. An operation that
+    # fails is left in place, so its error is still raised at run time
+    def __init__(self, symbol_table, shadowed_names):
+        self.symbol_table = symbol_table
+        self.shadowed_names = shadowed_names
+        self.constants = {}
+
+    def fold(self, node):
+        bound_names, read_names = set(), set()
+        collect_names(node, bound_names, read_names)
+
+        # A script started with RUN shares the global table and may rebind a constant
+        if 'RUN' not in read_names:
+            for name in CONSTANT_NAMES:
+                value = self.symbol_table.get(name)
+
+                if name not in bound_names and name not in self.shadowed_names and type(value) is Number:
+                    self.constants[name] = value
+
+        return self.visit_method(node)
+
+    def constant_of(self, node):
+        if type(node) is NumberNode:
+            return node.value
+
+        if type(node) is StringNode:
+            return String(node.token.value)
+
+        return None
+
+    def is_too_large(self, operation, left, right):
+        # A result constant_node would drop is not computed either, it could take as long as the program
+        if operation == OP_MUL and type(left) is String and type(right) is Number:
+            return type(right.value) is int and len(left.value) * right.value > self.max_string_length
+
+        if type(left) is not Number or type(right) is not Number:
+            return False
+
+        if type(left.value) is not int or type(right.value) is not int:
+            return False
+
+        if operation == OP_POW:
+            return abs(left.value) > 1 and left.value.bit_length() * right.value > self.max_integer_bits
+
+        if operation == OP_MUL:
+            return left.value.bit_length() + right.value.bit_length() > self.max_integer_bits + 1
+
+        return False
+
+    def constant_node(self, value, node):
+        # None when the value is not worth storing in the tree
+        span = node.start_position.index, node.end_position.index, node.start_position.source
+
+        if type(value) is Number:
+            if type(value.value) is int and value.value.bit_length() > self.max_integer_bits:
+                return None
+
+            # A negative number to a fractional power is complex, which has no literal
+            if type(value.value) not in (int, float):
+                return None
+
+            token_type = INT if type(value.value) is int else FLOAT
+            token = Token(token_type, value.value, *span)
+            return NumberNode(token)
+
+        if type(value) is String:
+            if len(value.value) > self.max_string_length:
+                return None
+
+            return StringNode(Token(STRING, value.value, *span))
+
+        return None
+
+    ###################################
+
+    def visit_method(self, node):
+        method_name = f'visit_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_visit_method)
+
+        return method(node)
+
+    def no_visit_method(self, node):
+        raise Exception(f'No visit_{type(node).__name__} method defined')
+
+    ###################################
+
+    def visit_ListNode(self, node):
+        node.nodes = [self.visit_method(element_node) for element_node in node.nodes]
+        return node
+
+    def visit_NumberNode(self, node):
+        return node
+
+    def visit_StringNode(self, node):
+        return node
+
+    def visit_BinaryOperationNode(self, node):
+        node.left_node = self.visit_method(node.left_node)
+        node.right_node = self.visit_method(node.right_node)
+
+        left = self.constant_of(node.left_node)
+        right = self.constant_of(node.right_node)
+
+        if left is None or right is None:
+            return node
+
+        if self.is_too_large(node.operation, left, right):
+            return node
+
+        try:
+            result, error = node.handlers[type(left), type(right)](left, right)
+        except Exception:
+            return node
+
+        if error:
+            return node
+
+        return self.constant_node(result, node) or node
+
+    def visit_UnaryOperationNode(self, node):
+        node.node = self.visit_method(node.node)
+
+        # NOT and negation of a String are left to the engines
+        if type(node.node) is not NumberNode:
+            return node
+
+        value = node.node.value
+
+        if node.op_token.type == MINUS:
+            result = Number(-value.value)
+        else:
+            result, _ = value.notted()
+
+        return self.constant_node(result, node) or node
+
+    def visit_VarAccessNode(self, node):
+        value = self.constants.get(node.var_name_token.value)
+
+        if value is None:
+            return node
+
+        return self.constant_node(value, node) or node
+
+    def visit_VarAssignNode(self, node):
+        node.value_node = self.visit_method(node.value_node)
+        return node
+
+    def visit_IfNode(self, node):
+        node.cases = [
+            (self.visit_method(condition), self.visit_method(expr), should_return_null)
+            for condition, expr, should_return_null in node.cases
+        ]
+
+        if node.else_case:
+            expr, should_return_null = node.else_case
+            node.else_case = (self.visit_method(expr), should_return_null)
+
+        return node
+
+    def visit_ForNode(self, node):
+        node.start_value_node = self.visit_method(node.start_value_node)
+        node.end_value_node = self.visit_method(node.end_value_node)
+
+        if node.step_value_node:
+            node.step_value_node = self.visit_method(node.step_value_node)
+
+        node.body_node = self.visit_method(node.body_node)
+        return node
+
+    def visit_WhileNode(self, node):
+        node.condition_node = self.visit_method(node.condition_node)
+        node.body_node = self.visit_method(node.body_node)
+        return node
+
+    def visit_ContinueNode(self, node):
+        return node
+
+    def visit_BreakNode(self, node):
+        return node
+
+    def visit_FuncDefinitionNode(self, node):
+        node.body_node = self.visit_method(node.body_node)
+        return node
+
+    def visit_CallNode(self, node):
+        node.node_to_call = self.visit_method(node.node_to_call)
+        node.arguments_nodes = [self.visit_method(arguments_node) for arguments_node in node.arguments_nodes]
+        return node
+
+    def visit_ReturnNode(self, node):
+        if node.node_to_return:
+            node.node_to_return = self.visit_method(node.node_to_return)
+
+        return node
+
+
+# Larger results are cheaper to compute when they are needed than to keep in the tree
+ConstantFolder.max_integer_bits = 1024
+ConstantFolder.max_string_length = 1024
@@ -4,3 +4,5 @@ class Context:
         self.parent = parent
         self.parent_entry_pos = parent_entry_pos
         self.symbol_table = None
+        # Names some function of the run binds in its own frame, shared by every call
+        self.shadowed_names = parent.shadowed_names if parent else None
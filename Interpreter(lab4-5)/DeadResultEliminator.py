@@ -0,0 +1,95 @@
+class DeadResultEliminator:
+    # Marks loops and IFs whose value nobody reads with should_return_null, so
+    # every engine runs them without collecting the values of their bodies
+    def eliminate(self, node):
+        self.visit_method(node, True)
+        return node
+
+    ###################################
+
+    def visit_method(self, node, is_used):
+        method_name = f'visit_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_visit_method)
+
+        return method(node, is_used)
+
+    def no_visit_method(self, node, is_used):
+        raise Exception(f'No visit_{type(node).__name__} method defined')
+
+    ###################################
+
+    def visit_ListNode(self, node, is_used):
+        # A block's value is the List of all its statement values
+        for element_node in node.nodes:
+            self.visit_method(element_node, is_used)
+
+    def visit_NumberNode(self, node, is_used):
+        pass
+
+    def visit_StringNode(self, node, is_used):
+        pass
+
+    def visit_BinaryOperationNode(self, node, is_used):
+        self.visit_method(node.left_node, True)
+        self.visit_method(node.right_node, True)
+
+    def visit_UnaryOperationNode(self, node, is_used):
+        self.visit_method(node.node, True)
+
+    def visit_VarAccessNode(self, node, is_used):
+        pass
+
+    def visit_VarAssignNode(self, node, is_used):
+        self.visit_method(node.value_node, True)
+
+    def visit_IfNode(self, node, is_used):
+        cases = []
+
+        for condition, expr, should_return_null in node.cases:
+            should_return_null = should_return_null or not is_used
+            self.visit_method(condition, True)
+            self.visit_method(expr, not should_return_null)
+            cases.append((condition, expr, should_return_null))
+
+        node.cases = cases
+
+        if node.else_case:
+            expr, should_return_null = node.else_case
+            should_return_null = should_return_null or not is_used
+            self.visit_method(expr, not should_return_null)
+            node.else_case = (expr, should_return_null)
+
+    def visit_ForNode(self, node, is_used):
+        self.visit_method(node.start_value_node, True)
+        self.visit_method(node.end_value_node, True)
+
+        if node.step_value_node:
+            self.visit_method(node.step_value_node, True)
+
+        node.should_return_null = node.should_return_null or not is_used
+        self.visit_method(node.body_node, not node.should_return_null)
+
+    def visit_WhileNode(self, node, is_used):
+        self.visit_method(node.condition_node, True)
+
+        node.should_return_null = node.should_return_null or not is_used
+        self.visit_method(node.body_node, not node.should_return_null)
+
+    def visit_ContinueNode(self, node, is_used):
+        pass
+
+    def visit_BreakNode(self, node, is_used):
+        pass
+
+    def visit_FuncDefinitionNode(self, node, is_used):
+        self.visit_method(node.body_node, node.should_auto_return)
+
+    def visit_CallNode(self, node, is_used):
+        self.visit_method(node.node_to_call, True)
+
+        for arguments_node in node.arguments_nodes:
+            self.visit_method(arguments_node, True)
+
+    def visit_ReturnNode(self, node, is_used):
+        if node.node_to_return:
+            self.visit_method(node.node_to_return, True)
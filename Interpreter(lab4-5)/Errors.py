@@ -10,8 +10,8 @@ class Error:
 
     def string_representation(self):
         result = f'{self.error_name}: {self.details}\n'
-        result += f'File {self.start_position.function}, line {self.start_position.line + 1}'
-        result += '\n\n' + arrow_string(self.start_position.function_text, self.start_position, self.end_position)
+        result += f'File {self.start_position.source.function}, line {self.start_position.line + 1}'
+        result += '\n\n' + arrow_string(self.start_position.source.text, self.start_position, self.end_position)
         return result
 
 
@@ -38,7 +38,7 @@ class RTError(Error):
     def string_repr(self):
         result = self.generate_traceback()
         result += f'{self.error_name}: {self.details}'
-        result += '\n\n' + arrow_string(self.start_position.function_text, self.start_position, self.end_position)
+        result += '\n\n' + arrow_string(self.start_position.source.text, self.start_position, self.end_position)
         return result
 
     def generate_traceback(self):
@@ -47,7 +47,7 @@ class RTError(Error):
         ctx = self.context
 
         while ctx:
-            result = f'\tFile {position.function}, line {str(position.line + 1)}, in {ctx.display_name}\n' + result
+            result = f'\tFile {position.source.function}, line {str(position.line + 1)}, in {ctx.display_name}\n' + result
             position = ctx.parent_entry_pos
             ctx = ctx.parent
 
@@ -1,15 +1,32 @@
 import os
+import sys
 
 from BaseFunction import BaseFunction
+from ClosureCompiler import ClosureCompiler
+from Compiler import Compiler
+from ConstantFolder import ConstantFolder
 from Context import Context
+from DeadResultEliminator import DeadResultEliminator
 from Errors import RTError
-from Lexer import Lexer
+from Lexer import Lexer, StreamLexer, open_script
+from LoopInvariantHoister import LoopInvariantHoister
+from LazyList import lazy_loop
 from List import List
-from Number import Number
+from Number import Number, make_number, loop_range, is_loop_entered
+from Operations import OP_DIV, OPERATION_METHODS, operation_error, negation_error
+from Memoize import MemoizedFunction
+from Nodes import ListNode
 from Parser import Parser
+from Purity import PurityChecker
+from Resolver import Resolver, collect_shadowed_names
 from RTResult import RTResult
+from Signals import ErrorSignal, ReturnSignal, TailCallSignal, BreakSignal, ContinueSignal
 from String import String
 from SymbolTable import SymbolTable
+from Tiering import tiering
+from TokenBuffer import TokenStream
+from Transpiler import Transpiler
+from VirtualMachine import VirtualMachine
 
 INT = 'INT'
 FLOAT = 'FLOAT'
@@ -37,6 +54,11 @@ ARROW = 'ARROW'
 NEWLINE = 'NEWLINE'
 EOF = 'EOF'
 
+TREE = 'tree'
+VM = 'vm'
+CLOSURE = 'closure'
+PYTHON = 'python'
+
 KEYWORDS = [
     'VAR',
     'AND',
@@ -59,33 +81,68 @@ KEYWORDS = [
 
 
 class Function(BaseFunction):
-    def __init__(self, name, body_node, arguments_names, should_auto_return):
+    def __init__(self, name, body_node, arguments_names, should_auto_return, layout=None, definition=None):
         super().__init__(name)
         self.body_node = body_node
         self.arguments_names = arguments_names
         self.should_auto_return = should_auto_return
+        self.layout = layout
+        self.definition = definition
 
     def execute(self, arguments):
         res = RTResult()
-        interpreter = Interpreter()
-        execute_context = self.generate_new_context()
 
-        res.register(self.check_and_populate_arguments(self.arguments_names, arguments, execute_context))
+        res.register(self.check_arguments(self.arguments_names, arguments))
 
         if res.should_return():
             return res
 
-        value = res.register(interpreter.visit_method(self.body_node, execute_context))
+        try:
+            return res.success(self.call(arguments))
+        except ErrorSignal as signal:
+            return res.failure(signal.error)
+        except BreakSignal:
+            return res.success_break()
+        except ContinueSignal:
+            return res.success_continue()
+
+    def call(self, arguments):
+        # Runs the body with already checked arguments, errors and loop jumps propagate as signals
+        execute_context = self.generate_new_context(self.layout)
+        compiled_body = self.definition and tiering.compiled_body(self.definition)
+
+        if compiled_body:
+            self.populate_arguments(self.arguments_names, arguments, execute_context)
 
-        if res.should_return() and res.func_return_value is None:
-            return res
+            try:
+                value = compiled_body(execute_context)
+            except ReturnSignal as signal:
+                return signal.value
+
+            return value if self.should_auto_return else Number.null
+
+        interpreter = Interpreter()
+
+        while True:
+            self.populate_arguments(self.arguments_names, arguments, execute_context)
 
-        ret_value = (value if self.should_auto_return else None) or res.func_return_value or Number.null
+            try:
+                value = interpreter.visit_method(self.body_node, execute_context)
+            except ReturnSignal as signal:
+                return signal.value
+            except TailCallSignal as signal:
+                # Self tail calls rerun the body in the same frame. Slots are
+                # left as they are: an unset local of the new call would have
+                # found the previous call's value through the dynamic chain
+                arguments = signal.arguments
+                continue
 
-        return res.success(ret_value)
+            return value if self.should_auto_return else Number.null
 
     def copy(self):
-        copy = Function(self.name, self.body_node, self.arguments_names, self.should_auto_return)
+        copy = Function(
+            self.name, self.body_node, self.arguments_names, self.should_auto_return, self.layout, self.definition
+        )
         copy.set_context(self.context)
         copy.set_position(self.start_position, self.end_position)
 
@@ -95,30 +152,36 @@ class Function(BaseFunction):
         return f"<function {self.name}>"
 
 
+ClosureCompiler.tree_function = Function
+
+
 class BuiltInFunction(BaseFunction):
     def __init__(self, name):
         super().__init__(name)
+        self.method = self.execute_methods.get(name)
 
     def execute(self, arguments):
         res = RTResult()
-        execute_context = self.generate_new_context()
+        method = self.method
 
-        method_name = f'execute_{self.name}'
-        method = getattr(self, method_name, self.no_visit_method)
+        if method is None:
+            self.no_visit_method()
+
+        execute_context = self.generate_new_context()
 
         res.register(self.check_and_populate_arguments(method.arguments_names, arguments, execute_context))
 
         if res.should_return():
             return res
 
-        return_value = res.register(method(execute_context))
+        return_value = res.register(method(self, execute_context))
 
         if res.should_return():
             return res
 
         return res.success(return_value)
 
-    def no_visit_method(self, node, context):
+    def no_visit_method(self):
         raise Exception(f'No execute_{self.name} method defined')
 
     def copy(self):
@@ -195,7 +258,7 @@ class BuiltInFunction(BaseFunction):
                 execute_context
             ))
 
-        return RTResult().success(Number(len(list_.elements)))
+        return RTResult().success(make_number(list_.length()))
 
     def execute_append(self, execute_context):
         list_ = execute_context.symbol_table.get("list")
@@ -233,7 +296,7 @@ class BuiltInFunction(BaseFunction):
                 execute_context
             ))
 
-        first_list.elements.extend(second_list.elements)
+        first_list.elements.extend(second_list.iterate())
 
         return RTResult().success(Number.null)
 
@@ -270,12 +333,14 @@ class BuiltInFunction(BaseFunction):
         return RTResult().success(element)
 
     def execute_run(self, execute_context):
+        # The script may call RUN again, which retargets this shared builtin
+        start_position, end_position = self.start_position, self.end_position
         fn = execute_context.symbol_table.get("fn")
 
         if not isinstance(fn, String):
 
             return RTResult().failure(RTError(
-                self.start_position, self.end_position,
+                start_position, end_position,
                 "Second argument must be string",
                 execute_context
             ))
@@ -283,22 +348,22 @@ class BuiltInFunction(BaseFunction):
         fn = fn.value
 
         try:
-            with open(fn, "r") as f:
-                script = f.read()
+            lexer = open_script(fn)
         except Exception as e:
 
             return RTResult().failure(RTError(
-                self.start_position, self.end_position,
+                start_position, end_position,
                 f"Failed to load script \"{fn}\"\n" + str(e),
                 execute_context
             ))
 
-        _, error = run(fn, script)
+        # The script's functions are called with this run's functions still on the stack
+        _, error = run_lexer(fn, lexer, shadowed_names=execute_context.shadowed_names)
 
         if error:
 
             return RTResult().failure(RTError(
-                self.start_position, self.end_position,
+                start_position, end_position,
                 f"Failed to finish executing script \"{fn}\"\n" +
                 error.string_representation(),
                 execute_context
@@ -306,6 +371,34 @@ class BuiltInFunction(BaseFunction):
 
         return RTResult().success(Number.null)
 
+    def execute_memoize(self, execute_context):
+        fn = execute_context.symbol_table.get("fn")
+
+        if isinstance(fn, MemoizedFunction):
+            return RTResult().success(fn)
+
+        if not isinstance(fn, BaseFunction):
+
+            return RTResult().failure(RTError(
+                self.start_position, self.end_position,
+                "Argument must be function",
+                execute_context
+            ))
+
+        root = execute_context.symbol_table.root
+        checker = PurityChecker(root, execute_context.shadowed_names)
+        reason = checker.check(fn)
+
+        if reason:
+
+            return RTResult().failure(RTError(
+                self.start_position, self.end_position,
+                f"{fn} cannot be memoized because it {reason}",
+                execute_context
+            ))
+
+        return RTResult().success(MemoizedFunction(fn, root, checker.bindings))
+
     execute_input.arguments_names = []
     execute_input_int.arguments_names = []
     execute_print.arguments_names = ['value']
@@ -318,8 +411,16 @@ class BuiltInFunction(BaseFunction):
     execute_len.arguments_names = ["list"]
     execute_append.arguments_names = ["list", "value"]
     execute_extend.arguments_names = ["first_list", "second_list"]
-    execute_extend.arguments_names = ["first_list", "second_list"]
+    execute_pop.arguments_names = ["list", "index"]
     execute_run.arguments_names = ["fn"]
+    execute_memoize.arguments_names = ["fn"]
+
+
+# Builtin name to its execute_ method, resolved once instead of on every call
+BuiltInFunction.execute_methods = {
+    name[len('execute_'):]: method for name, method in vars(BuiltInFunction).items()
+    if name.startswith('execute_')
+}
 
 
 BuiltInFunction.input = BuiltInFunction("input")
@@ -336,6 +437,7 @@ BuiltInFunction.append = BuiltInFunction("append")
 BuiltInFunction.extend = BuiltInFunction("extend")
 BuiltInFunction.pop = BuiltInFunction("pop")
 BuiltInFunction.run = BuiltInFunction("run")
+BuiltInFunction.memoize = BuiltInFunction("memoize")
 
 global_symbol_table = SymbolTable()
 global_symbol_table.set("NULL", Number.null)
@@ -357,333 +459,346 @@ global_symbol_table.set("POP", BuiltInFunction.pop)
 global_symbol_table.set("EXTEND", BuiltInFunction.extend)
 global_symbol_table.set("LEN", BuiltInFunction.len)
 global_symbol_table.set("RUN", BuiltInFunction.run)
+global_symbol_table.set("MEMOIZE", BuiltInFunction.memoize)
 
 
 class Interpreter:
     def visit_method(self, node, context):
-        method_name = f'visit_{type(node).__name__}'
-        method = getattr(self, method_name, self.no_visit_method)
-
-        return method(node, context)
+        return self.visit_methods[type(node)](self, node, context)
 
     def no_visit_method(self, node, context):
         raise Exception(f'No visit_{type(node).__name__} method defined')
 
-    ###################################
-
-    def visit_ListNode(self, node, context):
-        res = RTResult()
-        elements = []
-
-        for element_node in node.nodes:
-            elements.append(res.register(self.visit_method(element_node, context)))
-
-            if res.should_return():
-                return res
-
-        return res.success(
-            List(elements).set_context(context).set_position(node.start_position, node.end_position)
-        )
-
-    def visit_BinaryOperationNode(self, node, context):
+    def run(self, node, context):
         res = RTResult()
-        left = res.register(self.visit_method(node.left_node, context))
 
-        if res.should_return():
-            return res
+        try:
+            return res.success(self.visit_method(node, context))
+        except ErrorSignal as signal:
+            return res.failure(signal.error)
+        except (ReturnSignal, BreakSignal, ContinueSignal):
+            return res.success(None)
 
-        right = res.register(self.visit_method(node.right_node, context))
+    def discard(self, node, context):
+        # A block whose value nobody reads does not need to be collected into a List
+        if type(node) is not ListNode:
+            return self.visit_method(node, context)
 
-        if res.should_return():
-            return res
-
-        elif node.op_token.type == MUL:
-            result, error = left.multed_by(right)
+        for element_node in node.nodes:
+            self.discard(element_node, context)
 
-        elif node.op_token.type == DIV:
-            result, error = left.dived_by(right)
+    def enter_loop(self, node, context):
+        # Computes the loop's hoisted invariants, False if the original body has to run instead
+        if not node.hoisted_nodes:
+            return False
 
-        elif node.op_token.type == PLUS:
-            result, error = left.added_to(right)
+        try:
+            for hoisted_node in node.hoisted_nodes:
+                self.visit_method(hoisted_node, context)
+        except Exception:
+            return False
 
-        elif node.op_token.type == MINUS:
-            result, error = left.subbed_by(right)
+        return True
 
-        elif node.op_token.type == POW:
-            result, error = left.powed_by(right)
+    def leave_loop(self, node, context):
+        # Invariants of a loop outside any function are not left in the global table
+        if node.hoisted_names:
+            for name in node.hoisted_names:
+                context.symbol_table.symbols.pop(name, None)
 
-        elif node.op_token.type == EE:
-            result, error = left.get_comparison_eq(right)
+    ###################################
 
-        elif node.op_token.type == NE:
-            result, error = left.get_comparison_ne(right)
+    def visit_ListNode(self, node, context):
+        elements = [self.visit_method(element_node, context) for element_node in node.nodes]
 
-        elif node.op_token.type == GT:
-            result, error = left.get_comparison_gt(right)
+        return List(elements).set_context(context).set_position(node.start_position, node.end_position)
 
-        elif node.op_token.type == GTE:
-            result, error = left.get_comparison_gte(right)
+    def visit_BinaryOperationNode(self, node, context):
+        left = self.visit_method(node.left_node, context)
+        right = self.visit_method(node.right_node, context)
 
-        elif node.op_token.type == LT:
-            result, error = left.get_comparison_lt(right)
+        # list / i reads the element directly, anything unusual takes the generic path for its error
+        if type(left) is List and type(right) is Number and node.operation == OP_DIV:
+            try:
+                return left.elements[right.value]
+            except (IndexError, TypeError):
+                pass
 
-        elif node.op_token.type == LTE:
-            result, error = left.get_comparison_lte(right)
+        return self.binary_operation(node, left, right, context)
 
-        elif node.op_token.matches(KEYWORD, 'AND'):
-            result, error = left.anded_by(right)
+    def binary_operation(self, node, left, right, context):
+        cache = node.cache
 
-        elif node.op_token.matches(KEYWORD, 'OR'):
-            result, error = left.ored_by(right)
+        if type(left) is cache.left_type and type(right) is cache.right_type:
+            result, error = cache.handler(left, right)
+        else:
+            result, error = cache.miss(left, right)
 
         if error:
-            return res.failure(error)
+            raise ErrorSignal(operation_error(node, context, OPERATION_METHODS[node.operation], left, right))
 
-        else:
-            return res.success(result.set_position(node.start_position, node.end_position))
+        return result
 
     def visit_UnaryOperationNode(self, node, context):
-        res = RTResult()
-        number = res.register(self.visit_method(node.node, context))
-
-        if res.should_return():
-            return res
-
-        error = None
+        number = self.visit_method(node.node, context)
 
         if node.op_token.type == MINUS:
-            number, error = number.multed_by(Number(-1))
+            result, error = number.multed_by(Number(-1))
 
-        elif node.op_token.matches(KEYWORD, 'NOT'):
-            number, error = number.notted()
+            if error:
+                raise ErrorSignal(negation_error(node, context, number))
 
-        if error:
-            return res.failure(error)
+            return result
 
-        else:
-            return res.success(number.set_position(node.start_position, node.end_position))
+        result, _ = number.notted()
+
+        return result
 
     def visit_NumberNode(self, node, context):
 
-        return RTResult().success(
-            Number(node.token.value).set_context(context).set_position(node.start_position, node.end_position)
-        )
+        return node.value
 
     def visit_StringNode(self, node, context):
 
-        return RTResult().success(
-            String(node.token.value).set_context(context).set_position(node.start_position, node.end_position)
-        )
+        return String(node.token.value).set_context(context).set_position(node.start_position, node.end_position)
 
     def visit_VarAccessNode(self, node, context):
-        res = RTResult()
         var_name = node.var_name_token.value
-        value = context.symbol_table.get(var_name)
+        symbol_table = context.symbol_table
 
-        if not value:
+        if node.slot is not None:
+            value = symbol_table.slots[node.slot] or symbol_table.parent.get(var_name)
+        elif node.is_free and var_name not in context.shadowed_names:
+            value = symbol_table.root.symbols.get(var_name)
+        else:
+            value = symbol_table.get(var_name)
 
-            return res.failure(RTError(
+        if not value:
+            raise ErrorSignal(RTError(
                 node.start_position, node.end_position,
                 f"'{var_name}' is not defined",
                 context
             ))
 
-        value = value.copy().set_position(node.start_position, node.end_position).set_context(context)
-
-        return res.success(value)
+        # Values are shared, not copied: positions and contexts are attached
+        # on the error paths and at the call that needs them
+        return value
 
     def visit_VarAssignNode(self, node, context):
-        res = RTResult()
-        var_name = node.var_name_token.value
-        value = res.register(self.visit_method(node.value_node, context))
+        if node.increment is not None:
+            value = self.visit_VarAccessNode(node.value_node.left_node, context)
 
-        if res.should_return():
-            return res
+            if type(value) is Number:
+                value = make_number(value.value + node.increment)
+            else:
+                value = self.binary_operation(node.value_node, value, node.value_node.right_node.value, context)
+        else:
+            value = self.visit_method(node.value_node, context)
 
-        context.symbol_table.set(var_name, value)
+        if node.slot is not None:
+            context.symbol_table.slots[node.slot] = value
+        else:
+            context.symbol_table.set(node.var_name_token.value, value)
 
-        return res.success(value)
+        return value
 
     def visit_IfNode(self, node, context):
-        res = RTResult()
-
-        for condition, expr, should_return_null in node.cases:
-            condition_value = res.register(self.visit_method(condition, context))
-
-            if res.should_return():
-                return res
+        for (condition, expr, should_return_null), comparison in zip(node.cases, node.comparisons):
+            if comparison:
+                # x < c compares the raw value without building the TRUE/FALSE Number
+                left = self.visit_method(condition.left_node, context)
 
-            if condition_value.is_true():
-                expr_value = res.register(self.visit_method(expr, context))
+                if type(left) is Number:
+                    is_true = comparison[0](left.value, comparison[1])
+                else:
+                    is_true = self.binary_operation(condition, left, condition.right_node.value, context).is_true()
+            else:
+                is_true = self.visit_method(condition, context).is_true()
 
-                if res.should_return():
-                    return res
+            if is_true:
+                if should_return_null:
+                    self.discard(expr, context)
+                    return Number.null
 
-                return res.success(Number.null if should_return_null else expr_value)
+                return self.visit_method(expr, context)
 
         if node.else_case:
             expr, should_return_null = node.else_case
-            expr_value = res.register(self.visit_method(expr, context))
 
-            if res.should_return():
-                return res
+            if should_return_null:
+                self.discard(expr, context)
+                return Number.null
 
-            return res.success(Number.null if should_return_null else expr_value)
+            return self.visit_method(expr, context)
 
-        return res.success(Number.null)
+        return Number.null
 
     def visit_WhileNode(self, node, context):
-        res = RTResult()
-        elements = []
+        # The invariants are computed once the condition lets the body run
+        condition_node, body_node = node.condition_node, node.body_node
+        is_true = self.visit_method(condition_node, context).is_true()
 
-        while True:
-            condition = res.register(self.visit_method(node.condition_node, context))
+        if is_true and self.enter_loop(node, context):
+            condition_node, body_node = node.hoisted_condition, node.hoisted_body
 
-            if res.should_return():
-                return res
-
-            if not condition.is_true():
-                break
+        try:
+            if node.should_return_null:
+                while is_true:
+                    try:
+                        self.discard(body_node, context)
+                    except ContinueSignal:
+                        pass
+                    except BreakSignal:
+                        break
 
-            value = res.register(self.visit_method(node.body_node, context))
+                    is_true = self.visit_method(condition_node, context).is_true()
 
-            if res.should_return() and res.loop_should_continue == False and res.loop_should_break == False:
-                return res
+                return Number.null
 
-            if res.loop_should_continue:
-                continue
+            elements = []
 
-            if res.loop_should_break:
-                break
+            while is_true:
+                try:
+                    elements.append(self.visit_method(body_node, context))
+                except ContinueSignal:
+                    pass
+                except BreakSignal:
+                    break
 
-            elements.append(value)
+                is_true = self.visit_method(condition_node, context).is_true()
 
-        return res.success(
-            Number.null if node.should_return_null else
-            List(elements).set_context(context).set_position(node.start_position, node.end_position)
-        )
+            return List(elements).set_context(context).set_position(node.start_position, node.end_position)
+        finally:
+            self.leave_loop(node, context)
 
     def visit_ForNode(self, node, context):
-        res = RTResult()
-        elements = []
-
-        start_value = res.register(self.visit_method(node.start_value_node, context))
-
-        if res.should_return():
-            return res
-
-        end_value = res.register(self.visit_method(node.end_value_node, context))
-
-        if res.should_return():
-            return res
+        start_value = self.visit_method(node.start_value_node, context)
+        end_value = self.visit_method(node.end_value_node, context)
 
         if node.step_value_node:
-            step_value = res.register(self.visit_method(node.step_value_node, context))
-
-            if res.should_return():
-                return res
-        else:
-            step_value = Number(1)
-
-        i = start_value.value
-
-        if step_value.value >= 0:
-            condition = lambda: i < end_value.value
-
+            step_value = self.visit_method(node.step_value_node, context)
         else:
-            condition = lambda: i > end_value.value
+            step_value = Number.true
 
-        while condition():
-            context.symbol_table.set(node.var_name_token.value, Number(i))
-            i += step_value.value
+        symbol_table = context.symbol_table
+        slot = node.slot
+        var_name = node.var_name_token.value
+        should_return_null = node.should_return_null
+        body = self.discard if should_return_null else self.visit_method
+        elements = []
+        counter = loop_range(start_value.value, end_value.value, step_value.value)
 
-            value = res.register(self.visit_method(node.body_node, context))
+        lazy_list = None if should_return_null else lazy_loop(node, counter, symbol_table)
 
-            if res.should_return() and res.loop_should_continue == False and res.loop_should_break == False:
-                return res
+        if lazy_list is not None:
+            if counter:
+                symbol_table.set(var_name, make_number(counter[-1]))
 
-            if res.loop_should_continue:
-                continue
-
-            if res.loop_should_break:
-                break
+            return lazy_list.set_context(context).set_position(node.start_position, node.end_position)
 
-            elements.append(value)
+        # The invariants are computed only for a loop that makes a pass
+        is_entered = node.hoisted_nodes and is_loop_entered(start_value.value, end_value.value, step_value.value)
+        body_node = node.hoisted_body if is_entered and self.enter_loop(node, context) else node.body_node
 
-        return res.success(
-            Number.null if node.should_return_null else
-            List(elements).set_context(context).set_position(node.start_position, node.end_position)
-        )
+        try:
+            for i in counter:
+                if slot is not None:
+                    symbol_table.slots[slot] = make_number(i)
+                else:
+                    symbol_table.set(var_name, make_number(i))
+
+                try:
+                    value = body(body_node, context)
+                except ContinueSignal:
+                    continue
+                except BreakSignal:
+                    break
+
+                if not should_return_null:
+                    elements.append(value)
+
+            return (
+                Number.null if should_return_null else
+                List(elements).set_context(context).set_position(node.start_position, node.end_position)
+            )
+        finally:
+            self.leave_loop(node, context)
 
     def visit_ContinueNode(self, node, context):
-
-        return RTResult().success_continue()
+        raise ContinueSignal()
 
     def visit_BreakNode(self, node, context):
-
-        return RTResult().success_break()
+        raise BreakSignal()
 
     def visit_FuncDefinitionNode(self, node, context):
-        res = RTResult()
-
         func_name = node.var_name_token.value if node.var_name_token else None
         body_node = node.body_node
         arguments_names = [arguments_name.value for arguments_name in node.arguments_name_tokens]
-        func_value = Function(func_name, body_node, arguments_names, node.should_auto_return).set_context(
-            context).set_position(
-            node.start_position, node.end_position)
+        func_value = Function(
+            func_name, body_node, arguments_names, node.should_auto_return, node.layout, node
+        ).set_context(context).set_position(node.start_position, node.end_position)
 
-        if node.var_name_token:
+        if node.slot is not None:
+            context.symbol_table.slots[node.slot] = func_value
+        elif node.var_name_token:
             context.symbol_table.set(func_name, func_value)
 
-        return res.success(func_value)
+        return func_value
 
     def visit_CallNode(self, node, context):
-        res = RTResult()
-        arguments = []
-
-        value_to_call = res.register(self.visit_method(node.node_to_call, context))
-
-        if res.should_return():
-            return res
+        value_to_call = self.visit_method(node.node_to_call, context)
+        arguments = [self.visit_method(arguments_node, context) for arguments_node in node.arguments_nodes]
 
-        value_to_call = value_to_call.copy().set_position(node.start_position, node.end_position)
+        if node.is_append and value_to_call is BuiltInFunction.append and type(arguments[0]) is List:
+            arguments[0].elements.append(arguments[1])
+            return Number.null
 
-        for arguments_node in node.arguments_nodes:
-            arguments.append(res.register(self.visit_method(arguments_node, context)))
+        # Functions read their position and caller context only on entry, so the
+        # shared value is retargeted in place right before it executes
+        if isinstance(value_to_call, BaseFunction):
+            value_to_call.set_position(node.start_position, node.end_position).set_context(context)
+        else:
+            value_to_call = value_to_call.copy().set_position(node.start_position, node.end_position).set_context(context)
 
-            if res.should_return():
-                return res
+        if type(value_to_call) is Function and len(arguments) == len(value_to_call.arguments_names):
+            if value_to_call.body_node is node.tail_body:
+                raise TailCallSignal(arguments)
 
-        return_value = res.register(value_to_call.execute(arguments))
+            return value_to_call.call(arguments)
 
-        if res.should_return():
-            return res
+        res = value_to_call.execute(arguments)
 
-        return_value = return_value.copy().set_position(node.start_position, node.end_position).set_context(context)
+        if res.error:
+            raise ErrorSignal(res.error)
+        if res.loop_should_break:
+            raise BreakSignal()
+        if res.loop_should_continue:
+            raise ContinueSignal()
 
-        return res.success(return_value)
+        return res.value
 
     def visit_ReturnNode(self, node, context):
-        res = RTResult()
-
         if node.node_to_return:
-            value = res.register(self.visit_method(node.node_to_return, context))
+            raise ReturnSignal(self.visit_method(node.node_to_return, context))
 
-            if res.should_return():
-                return res
+        raise ReturnSignal(Number.null)
+
+
+class VisitMethods(dict):
+    # Node class to its visit_ method, resolved on the first visit of each class
+    def __missing__(self, node_type):
+        method = self[node_type] = getattr(Interpreter, f'visit_{node_type.__name__}', Interpreter.no_visit_method)
+        return method
 
-        else:
-            value = Number.null
 
-        return res.success_return(value)
+Interpreter.visit_methods = VisitMethods()
 
 ###############RUN########################
 
-def run(fn, text):
-    # Generate tokens
+def run(fn, text, engine=TREE, fold_constants=True, token_buffer=False):
+    # Generate tokens. A TokenBuffer takes less memory, but parsing from it is slower
     lexer = Lexer(fn, text)
-    tokens, error = lexer.make_tokens()
+    tokens, error = lexer.make_token_buffer() if token_buffer else lexer.make_tokens()
     if error: return None, error
 
     # Generate AST
@@ -691,11 +806,59 @@ def run(fn, text):
     ast = parser.parse()
     if ast.error: return None, ast.error
 
+    return run_program(fn, ast.node, engine, fold_constants)
+
+def run_stream(fn, chunks, engine=TREE, fold_constants=True):
+    # Like run, for a program read from a file object or text chunks while it is parsed
+    return run_lexer(fn, StreamLexer(fn, chunks), engine, fold_constants)
+
+def run_file(fn, engine=TREE, fold_constants=True):
+    return run_lexer(fn, open_script(fn), engine, fold_constants)
+
+def run_lexer(fn, lexer, engine=TREE, fold_constants=True, shadowed_names=None):
+    tokens = TokenStream(lexer)
+
+    parser = Parser(tokens)
+    ast = parser.parse()
+
+    # As in run, an error of the lexer anywhere in the program comes first
+    tokens.read_all()
+    if lexer.error: return None, lexer.error
+    if ast.error: return None, ast.error
+
+    return run_program(fn, ast.node, engine, fold_constants, shadowed_names)
+
+def run_program(fn, node, engine, fold_constants, enclosing_shadowed_names=None):
+    shadowed_names = collect_shadowed_names(node, global_symbol_table.symbols)
+
+    # A script started with RUN shares the names of the run that started it, both ways
+    if enclosing_shadowed_names is not None:
+        enclosing_shadowed_names.update(shadowed_names)
+        shadowed_names = enclosing_shadowed_names
+
+    if fold_constants:
+        ConstantFolder(global_symbol_table, shadowed_names).fold(node)
+
+    DeadResultEliminator().eliminate(node)
+    LoopInvariantHoister(global_symbol_table, shadowed_names).hoist(node)
+    Resolver().resolve(node)
+
     # Run program
-    interpreter = Interpreter()
     context = Context('<program>')
     context.symbol_table = global_symbol_table
-    result = interpreter.visit(ast.node, context)
+    context.shadowed_names = shadowed_names
+
+    if engine == TREE:
+        result = Interpreter().run(node, context)
+    elif engine == VM:
+        code = Compiler().compile(node)
+        result = VirtualMachine().run(code, context)
+    elif engine == CLOSURE:
+        result = ClosureCompiler().run(node, context)
+    elif engine == PYTHON:
+        result = Transpiler(fn).run(node, context)
+    else:
+        raise Exception(f"Unknown engine '{engine}'")
 
     return result.value, result.error
 
@@ -751,25 +914,14 @@ PRINT(min(c))
 PRINT(max(c))
 '''
 
-# Generate tokens
-lexer = Lexer('<stdin>', test)
-tokens, error = lexer.make_tokens()
-if error:
-    print(error.string_representation())
-
-# Generate AST
-parser = Parser(tokens)
-ast = parser.parse()
-if ast.error:
-    print(ast.error.string_representation())
-
-# Run program
-interpreter = Interpreter()
-context = Context('<program>')
-context.symbol_table = global_symbol_table
-result = interpreter.visit_method(ast.node, context)
-
-if result.error:
-    print(result.error.string_representation())
-else:
-    result.value
+if __name__ == '__main__':
+    # A script file given, or piped in and run as it is read, otherwise the sample program
+    if len(sys.argv) > 1:
+        _, error = run_file(sys.argv[1])
+    elif sys.stdin.isatty():
+        _, error = run('<stdin>', test)
+    else:
+        _, error = run_stream('<stdin>', sys.stdin)
+
+    if error:
+        print(error.string_representation())
@@ -0,0 +1,133 @@
+from List import List
+from Number import Number, make_number
+from Operations import OP_DIV, OP_POW
+from Value import Value
+
+MINUS = 'MINUS'
+
+
+def collect_lazy_names(node, names):
+    # A body built from numbers, variables and operators that cannot fail on
+    # numbers gives the same elements whenever it is evaluated
+    node_type = type(node).__name__
+
+    if node_type == 'NumberNode':
+        return True
+
+    if node_type == 'VarAccessNode':
+        names.add(node.var_name_token.value)
+        return True
+
+    if node_type == 'BinaryOperationNode':
+        return (
+            node.operation != OP_DIV and node.operation != OP_POW and
+            collect_lazy_names(node.left_node, names) and collect_lazy_names(node.right_node, names)
+        )
+
+    if node_type == 'UnaryOperationNode':
+        return collect_lazy_names(node.node, names)
+
+    return False
+
+
+def lazy_names(node):
+    # Variables a FOR body reads besides its counter, None if the loop cannot be lazy
+    names = set()
+
+    if not collect_lazy_names(node.body_node, names):
+        return None
+
+    names.discard(node.var_name_token.value)
+
+    return sorted(names)
+
+
+def lazy_loop(node, counter, symbol_table):
+    # The loop value as a LazyList, None when the loop has to run eagerly
+    if node.lazy_names is None or type(counter) is not range or len(counter) < LazyList.min_length:
+        return None
+
+    values = {}
+
+    for name in node.lazy_names:
+        value = symbol_table.get(name)
+
+        if type(value) is not Number:
+            return None
+
+        values[name] = value
+
+    return LazyList(node.body_node, node.var_name_token.value, counter, values)
+
+
+def evaluate(node, values):
+    node_type = type(node).__name__
+
+    if node_type == 'NumberNode':
+        return node.value
+
+    if node_type == 'VarAccessNode':
+        return values[node.var_name_token.value]
+
+    if node_type == 'BinaryOperationNode':
+        left = evaluate(node.left_node, values)
+        right = evaluate(node.right_node, values)
+        result, _ = node.handlers[type(left), type(right)](left, right)
+        return result
+
+    value = evaluate(node.node, values)
+
+    if node.op_token.type == MINUS:
+        return make_number(-value.value)
+
+    result, _ = value.notted()
+    return result
+
+
+class LazyList(List):
+    # Elements of a FOR expression, computed from the counter when they are read.
+    # The variables the body reads were captured when the loop ran
+    def __init__(self, body_node, var_name, counter, values):
+        Value.__init__(self)
+        self.body_node = body_node
+        self.var_name = var_name
+        self.counter = counter
+        self.values = values
+        self.materialized = None
+
+    @property
+    def elements(self):
+        if self.materialized is None:
+            self.materialized = list(self.iterate())
+
+        return self.materialized
+
+    def element(self, index):
+        self.values[self.var_name] = make_number(self.counter[index])
+
+        return evaluate(self.body_node, self.values)
+
+    def iterate(self):
+        if self.materialized is not None:
+            return self.materialized
+
+        return (self.element(index) for index in range(len(self.counter)))
+
+    def length(self):
+        if self.materialized is not None:
+            return len(self.materialized)
+
+        return len(self.counter)
+
+    def dived_by(self, other):
+        if self.materialized is None and type(other) is Number:
+            try:
+                return self.element(other.value), None
+            except (IndexError, TypeError):
+                pass
+
+        return super().dived_by(other)
+
+
+# Shorter loops are cheaper to collect right away
+LazyList.min_length = 4096
@@ -1,12 +1,10 @@
-import string
+import mmap
+import re
 
 from Errors import IllegalCharError, ExpectedCharError
-from Position import Position
+from Position import Position, Source, StreamSource, MappedSource
 from Token import Token
-
-DIGITS = '0123456789'
-LETTERS = string.ascii_letters
-LETTERS_DIGITS = LETTERS + DIGITS
+from TokenBuffer import TokenBuffer
 
 #######################################
 # TOKENS
@@ -62,204 +60,217 @@ KEYWORDS = [
 # LEXER
 #######################################
 
+# One alternative per kind of lexeme, tried in order at the current index
+TOKEN_PATTERN = re.compile(r'''
+    (?P<SPACE>[ \t]+)
+  | (?P<COMMENT>\#[^\n]*\n?)
+  | (?P<NEWLINE>[;\n])
+  | (?P<FLOAT>[0-9]+\.[0-9]*)
+  | (?P<INT>[0-9]+)
+  | (?P<IDENTIFIER>[A-Za-z][A-Za-z0-9_]*)
+  | (?P<STRING>"[^"]*"?)
+  | (?P<OPERATOR>->|==|!=|<=|>=|[-+*/^=<>()\[\],])
+  | (?P<BANG>!)
+''', re.VERBOSE)
+
+OPERATORS = {
+    '+': PLUS,
+    '-': MINUS,
+    '*': MUL,
+    '/': DIV,
+    '^': POW,
+    '=': EQ,
+    '(': LPAREN,
+    ')': RPAREN,
+    '[': LSQUARE,
+    ']': RSQUARE,
+    '==': EE,
+    '!=': NE,
+    '<': LT,
+    '>': GT,
+    '<=': LTE,
+    '>=': GTE,
+    ',': COMMA,
+    '->': ARROW,
+}
+
+
 class Lexer:
     def __init__(self, function, text):
         self.function = function
         self.text = text
-        self.position = Position(-1, 0, -1, function, text)
-        self.current_character = None
-        self.next_character()
+        self.source = Source(function, text)
+        self.error = None
+
+    def scan(self):
+        # The type, value, start and end of every token. Scanning stops at the
+        # first character no token can start with and leaves its error in self.error
+        end = yield from self.scan_text(self.text, 0, True)
+
+        if not self.error:
+            yield EOF, None, end, end + 1
+
+    def scan_text(self, text, offset, is_complete):
+        # The tokens of text, which starts at offset in the program. Unless the
+        # text is complete, stops at the first lexeme that may go on past its
+        # end. Returns the offset scanning stopped at
+        source = self.source
+        match_token = TOKEN_PATTERN.match
+        index = 0
+
+        while index < len(text):
+            match = match_token(text, index)
+
+            if match is None:
+                start = offset + index
+                self.error = IllegalCharError(Position(start, source), Position(start + 1, source), "'" + text[index] + "'")
+                return start + 1
+
+            if match.end() == len(text) and not is_complete:
+                break
+
+            kind = match.lastgroup
+            start = offset + index
+            index = match.end()
+
+            if kind == 'OPERATOR':
+                yield OPERATORS[match.group()], None, start, offset + index
+            elif kind == 'IDENTIFIER':
+                value = match.group()
+                yield KEYWORD if value in KEYWORDS else IDENTIFIER, value, start, offset + index
+            elif kind == 'INT':
+                yield INT, int(match.group()), start, offset + index
+            elif kind == 'FLOAT':
+                yield FLOAT, float(match.group()), start, offset + index
+            elif kind == 'NEWLINE':
+                yield NEWLINE, None, start, offset + index
+            elif kind == 'STRING':
+                string = match.group()
+
+                # An unclosed string runs to the end of the text and one past it
+                if len(string) > 1 and string[-1] == '"':
+                    string = string[1:-1]
+                else:
+                    string = string[1:]
+                    index += 1
+
+                # A backslash is dropped and the character after it kept as it is
+                yield STRING, string.replace('\\', ''), start, offset + index
+            elif kind == 'BANG':
+                # '!' is only the start of '!='. The character after it is skipped too
+                self.error = ExpectedCharError(Position(start, source), Position(start + 2, source), "'=' (after '!')")
+                return start + 2
 
-    def next_character(self):
-        self.position.next_character(self.current_character)
-        if self.position.index < len(self.text):
-            self.current_character = self.text[self.position.index]
-        else:
-            self.current_character = None
+            # Spaces and comments make no token, a comment takes the newline ending it along
+
+        return offset + index
 
     def make_tokens(self):
-        tokens = []
-
-        while self.current_character != None:
-            if self.current_character in ' \t':
-                self.next_character()
-            elif self.current_character == '(':
-                tokens.append(Token(LPAREN, start_position=self.position))
-                self.next_character()
-            elif self.current_character == ')':
-                tokens.append(Token(RPAREN, start_position=self.position))
-                self.next_character()
-            elif self.current_character == '[':
-                tokens.append(Token(LSQUARE, start_position=self.position))
-                self.next_character()
-            elif self.current_character == ']':
-                tokens.append(Token(RSQUARE, start_position=self.position))
-                self.next_character()
-            elif self.current_character == '!':
-                token, error = self.make_token_not_equals()
-                if error:
-                    return [], error
-                tokens.append(token)
-            elif self.current_character == '#':
-                self.skip_comment()
-            elif self.current_character in ';\n':
-                tokens.append(Token(NEWLINE, start_position=self.position))
-                self.next_character()
-            elif self.current_character == '^':
-                tokens.append(Token(POW, start_position=self.position))
-                self.next_character()
-            elif self.current_character == '=':
-                tokens.append(self.make_token_equals())
-            elif self.current_character == '<':
-                tokens.append(self.make_token_less_than())
-            elif self.current_character == '>':
-                tokens.append(self.make_token_greater_than())
-            elif self.current_character == ',':
-                tokens.append(Token(COMMA, start_position=self.position))
-                self.next_character()
-            elif self.current_character in DIGITS:
-                tokens.append(self.make_token_number())
-            elif self.current_character in LETTERS:
-                tokens.append(self.make_token_identifier())
-            elif self.current_character == '"':
-                tokens.append(self.make_token_string())
-            elif self.current_character == '+':
-                tokens.append(Token(PLUS, start_position=self.position))
-                self.next_character()
-            elif self.current_character == '-':
-                tokens.append(self.make_token_minus_or_arrow())
-            elif self.current_character == '*':
-                tokens.append(Token(MUL, start_position=self.position))
-                self.next_character()
-            elif self.current_character == '/':
-                tokens.append(Token(DIV, start_position=self.position))
-                self.next_character()
-            else:
-                start_position = self.position.copy_position()
-                char = self.current_character
-                self.next_character()
-                return [], IllegalCharError(start_position, self.position, "'" + char + "'")
-
-        tokens.append(Token(EOF, start_position=self.position))
+        source = self.source
+        tokens = [Token(type_, value, start, end, source) for type_, value, start, end in self.scan()]
+
+        if self.error:
+            return [], self.error
 
         return tokens, None
 
-    def make_token_identifier(self):
-        id_str = ''
-        start_position = self.position.copy_position()
+    def make_token_buffer(self):
+        # The same tokens packed into a TokenBuffer
+        tokens = TokenBuffer(self.source)
 
-        while self.current_character != None and self.current_character in LETTERS_DIGITS + '_':
-            id_str += self.current_character
-            self.next_character()
+        for type_, value, start, end in self.scan():
+            tokens.add(type_, value, start, end)
 
-        if id_str in KEYWORDS:
-            token_type = KEYWORD
-        else:
-            token_type = IDENTIFIER
-        return Token(token_type, id_str, start_position, self.position)
-
-    def make_token_minus_or_arrow(self):
-        token_type = MINUS
-        start_position = self.position.copy_position()
-        self.next_character()
-
-        if self.current_character == '>':
-            self.next_character()
-            token_type = ARROW
-
-        return Token(token_type, start_position=start_position, end_position=self.position)
-
-    def make_token_equals(self):
-        token_type = EQ
-        start_position = self.position.copy_position()
-        self.next_character()
-
-        if self.current_character == '=':
-            self.next_character()
-            token_type = EE
-
-        return Token(token_type, start_position=start_position, end_position=self.position)
-
-    def make_token_not_equals(self):
-        start_position = self.position.copy_position()
-        self.next_character()
-
-        if self.current_character == '=':
-            self.next_character()
-            return Token(NE, start_position=start_position, end_position=self.position), None
-
-        self.next_character()
-        return None, ExpectedCharError(start_position, self.position, "'=' (after '!')")
-
-    def make_token_greater_than(self):
-        token_type = GT
-        start_position = self.position.copy_position()
-        self.next_character()
-
-        if self.current_character == '=':
-            self.next_character()
-            token_type = GTE
-
-        return Token(token_type, start_position=start_position, end_position=self.position)
-
-    def make_token_less_than(self):
-        token_type = LT
-        start_position = self.position.copy_position()
-        self.next_character()
-
-        if self.current_character == '=':
-            self.next_character()
-            token_type = LTE
-
-        return Token(token_type, start_position=start_position, end_position=self.position)
-
-    def skip_comment(self):
-        self.next_character()
-
-        while self.current_character != '\n':
-            self.next_character()
-
-        self.next_character()
-
-    def make_token_number(self):
-        number_string = ''
-        dot_count = 0
-        start_position = self.position.copy_position()
-
-        while self.current_character != None and self.current_character in DIGITS + '.':
-            if self.current_character == '.':
-                if dot_count == 1:
-                    break
-                dot_count += 1
-            number_string += self.current_character
-            self.next_character()
-
-        if dot_count == 0:
-            return Token(INT, int(number_string), start_position, self.position)
-        else:
-            return Token(FLOAT, float(number_string), start_position, self.position)
-
-    def make_token_string(self):
-        string = ''
-        start_position = self.position.copy_position()
-        escape_character = False
-        self.next_character()
-
-        escape_characters = {
-            'n': '\n',
-            't': '\t'
-        }
-
-        while self.current_character != None and (self.current_character != '"' or escape_character):
-            if escape_character:
-                string += escape_characters.get(self.current_character, self.current_character)
-            else:
-                if self.current_character == '\\':
-                    escape_character = True
-                else:
-                    string += self.current_character
-            self.next_character()
-            escape_character = False
+        if self.error:
+            return None, self.error
+
+        return tokens, None
+
+
+class StreamLexer(Lexer):
+    # Lexes a program read from a file object or an iterable of text chunks,
+    # reading the next chunk only when the tokens before it are used up
+    def __init__(self, function, chunks):
+        if hasattr(chunks, 'read'):
+            file = chunks
+            chunks = iter(lambda: file.read(self.chunk_size), '')
+
+        self.function = function
+        self.chunks = iter(chunks)
+        self.source = StreamSource(function)
+        self.error = None
+
+    def scan(self):
+        text, offset = '', 0
+
+        for chunk in self.chunks:
+            self.source.append(chunk)
+            text += chunk
+            end = yield from self.scan_text(text, offset, False)
+
+            if self.error:
+                self.read_line_end(text[self.error.end_position.index - offset:])
+                return
+
+            # A lexeme cut by the end of the chunk is scanned again with the next one
+            text, offset = text[end - offset:], end
+
+        end = yield from self.scan_text(text, offset, True)
+
+        if not self.error:
+            yield EOF, None, end, end + 1
+
+    def read_line_end(self, text):
+        # An error is shown with the whole of the lines it is on
+        while '\n' not in text:
+            text = next(self.chunks, None)
+
+            if text is None:
+                return
+
+            self.source.append(text)
+
+
+# Characters read from a file at a time
+StreamLexer.chunk_size = 1 << 16
+
+
+class MappedLexer(StreamLexer):
+    # Lexes a file through a memory map, decoding a chunk at a time
+    def __init__(self, function, mapped):
+        chunk_size = self.chunk_size
+
+        self.function = function
+        self.chunks = (mapped[index:index + chunk_size].decode('ascii') for index in range(0, len(mapped), chunk_size))
+        self.source = MappedSource(function, mapped)
+        self.error = None
+
+
+def is_mappable(mapped):
+    # ASCII with no carriage returns, so a character is always one byte
+    if mapped.find(b'\r') >= 0:
+        return False
+
+    chunk_size = StreamLexer.chunk_size
+
+    return all(mapped[index:index + chunk_size].isascii() for index in range(0, len(mapped), chunk_size))
+
+
+def open_script(path):
+    # A lexer for the script in a file. A file of ASCII text with no carriage
+    # returns is lexed from a memory map, others are read as text like before
+    with open(path, 'rb') as file:
+        try:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Empty files and pipes cannot be mapped
+            mapped = None
+
+    if mapped is not None:
+        if is_mappable(mapped):
+            return MappedLexer(path, mapped)
+
+        mapped.close()
 
-        self.next_character()
-        return Token(STRING, string, start_position, self.position)
\ No newline at end of file
+    with open(path, 'r') as file:
+        return Lexer(path, file.read())
@@ -52,6 +52,12 @@ class List(Value):
         else:
             return None, Value.illegal_operation(self, other)
 
+    def iterate(self):
+        return self.elements
+
+    def length(self):
+        return len(self.elements)
+
     def copy(self):
         copy = List(self.elements)
         copy.set_position(self.start_position, self.end_position)
@@ -59,8 +65,8 @@ class List(Value):
         return copy
 
     def __repr__(self):
-        return f'[{", ".join([repr(x) for x in self.elements])}]'
+        return f'[{", ".join([repr(x) for x in self.iterate()])}]'
 
     def __str__(self):
-        return ", ".join([str(x) for x in self.elements])
+        return ", ".join([str(x) for x in self.iterate()])
 
@@ -0,0 +1,261 @@
+import copy
+
+from ConstantFolder import collect_names
+from Nodes import VarAccessNode, VarAssignNode
+from Operations import OP_MUL, OP_DIV, OP_PLUS, OP_MINUS, OP_POW
+from Resolver import child_nodes, collect_assigned_names, walk
+from Token import Token
+
+IDENTIFIER = 'IDENTIFIER'
+MINUS = 'MINUS'
+
+# Builtins that only look at their arguments. LEN also reads a list's elements
+QUERY_BUILTINS = {'len', 'is_number', 'is_string', 'is_function', 'is_list'}
+
+# On a List operand these append, remove or extend in place
+LIST_MUTATING_OPERATIONS = (OP_PLUS, OP_MINUS, OP_MUL)
+
+# With a Number on the left these always give a Number or fail
+ARITHMETIC_OPERATIONS = (OP_MUL, OP_DIV, OP_PLUS, OP_MINUS, OP_POW)
+
+# Statements that end a pass early
+LEAVING_NODES = ('ReturnNode', 'BreakNode', 'ContinueNode')
+
+
+class Loop:
+    # What a loop may change while it runs
+    def __init__(self, assigned_names, calls_out, may_mutate):
+        self.assigned_names = assigned_names
+        self.calls_out = calls_out
+        self.may_mutate = may_mutate
+        # Set once the rewrite passes a point the pass may leave the loop at
+        self.may_leave = False
+
+
+class LoopInvariantHoister:
+    # Gives FOR and WHILE loops a prelude that computes the pure expressions
+    # their body and condition recompute with the same result on every pass,
+    # and a copy of the body reading the precomputed values instead. Only
+    # expressions every pass evaluates are hoisted, and the engines run the
+    # prelude once the loop is known to make a pass. If it fails anyway they
+    # run the original body, which raises the error where the program would
+    def __init__(self, symbol_table, shadowed_names):
+        self.symbol_table = symbol_table
+        self.shadowed_names = shadowed_names
+        self.bound_names = set()
+        self.local_names = None
+        self.hoisted_count = 0
+
+    def hoist(self, node):
+        read_names = set()
+        collect_names(node, self.bound_names, read_names)
+        self.visit(node)
+
+        return node
+
+    def visit(self, node):
+        node_type = type(node).__name__
+
+        if node_type == 'FuncDefinitionNode':
+            outer_local_names = self.local_names
+            self.local_names = {arguments_name.value for arguments_name in node.arguments_name_tokens}
+            self.local_names.update(collect_assigned_names(node.body_node))
+            self.visit(node.body_node)
+            self.local_names = outer_local_names
+
+            return
+
+        for child in child_nodes(node):
+            self.visit(child)
+
+        if node_type == 'ForNode':
+            self.hoist_loop(node, [node.body_node], {node.var_name_token.value})
+        elif node_type == 'WhileNode':
+            self.hoist_loop(node, [node.condition_node, node.body_node], set())
+
+    def hoist_loop(self, node, parts, assigned_names):
+        calls_out, may_mutate = False, False
+
+        for part in parts:
+            assigned_names.update(collect_assigned_names(part))
+
+            for descendant in walk(part):
+                if type(descendant).__name__ == 'CallNode' and not self.is_query(descendant):
+                    calls_out = True
+
+                if type(descendant).__name__ == 'BinaryOperationNode' and \
+                        descendant.operation in LIST_MUTATING_OPERATIONS and \
+                        not self.is_number_expression(descendant.left_node):
+                    may_mutate = True
+
+        loop = Loop(assigned_names, calls_out, calls_out or may_mutate)
+        hoisted_nodes = []
+        hoisted_parts = [self.rewrite(part, loop, hoisted_nodes) for part in parts]
+
+        if not hoisted_nodes:
+            return
+
+        node.hoisted_nodes = hoisted_nodes
+        node.hoisted_body = hoisted_parts[-1]
+
+        # Outside a function they are set in the global table, the engines remove them after the loop
+        if self.local_names is None:
+            node.hoisted_names = [hoisted_node.var_name_token.value for hoisted_node in hoisted_nodes]
+
+        if type(node).__name__ == 'WhileNode':
+            node.hoisted_condition = hoisted_parts[0]
+
+    def rewrite(self, node, loop, hoisted_nodes):
+        # The node with its invariant subexpressions replaced, copied only where something changed.
+        # Parts that only run on some passes, or after the pass may have ended, are left as they are
+        if loop.may_leave:
+            return node
+
+        if self.is_worth_hoisting(node) and self.is_invariant(node, loop):
+            start_position, end_position = node.start_position, node.end_position
+            var_name_token = Token(
+                IDENTIFIER, f'${self.hoisted_count}', start_position.index, end_position.index, start_position.source
+            )
+            self.hoisted_count += 1
+            hoisted_nodes.append(VarAssignNode(var_name_token, node))
+
+            return VarAccessNode(var_name_token)
+
+        node_type = type(node).__name__
+
+        def rewrite(child):
+            return child and self.rewrite(child, loop, hoisted_nodes)
+
+        if node_type == 'ListNode':
+            changes = {'nodes': [rewrite(element_node) for element_node in node.nodes]}
+        elif node_type == 'BinaryOperationNode':
+            changes = {'left_node': rewrite(node.left_node), 'right_node': rewrite(node.right_node)}
+        elif node_type == 'UnaryOperationNode':
+            changes = {'node': rewrite(node.node)}
+        elif node_type == 'VarAssignNode':
+            changes = {'value_node': rewrite(node.value_node)}
+        elif node_type == 'IfNode':
+            condition, expr, should_return_null = node.cases[0]
+            changes = {'cases': [(rewrite(condition), expr, should_return_null)] + node.cases[1:]}
+        elif node_type == 'ForNode':
+            changes = {
+                'start_value_node': rewrite(node.start_value_node), 'end_value_node': rewrite(node.end_value_node),
+                'step_value_node': rewrite(node.step_value_node),
+            }
+        elif node_type == 'WhileNode':
+            changes = {'condition_node': rewrite(node.condition_node)}
+        elif node_type == 'CallNode':
+            changes = {
+                'node_to_call': rewrite(node.node_to_call),
+                'arguments_nodes': [rewrite(arguments_node) for arguments_node in node.arguments_nodes],
+            }
+        elif node_type == 'ReturnNode':
+            changes = {'node_to_return': rewrite(node.node_to_return)}
+        else:
+            # A function body runs in its own frame
+            changes = {}
+
+        if node_type in ('IfNode', 'ForNode', 'WhileNode') + LEAVING_NODES:
+            loop.may_leave = any(type(descendant).__name__ in LEAVING_NODES for descendant in walk(node))
+
+        if all(is_same(value, getattr(node, field)) for field, value in changes.items()):
+            return node
+
+        new_node = copy.copy(node)
+
+        for field, value in changes.items():
+            setattr(new_node, field, value)
+
+        return new_node
+
+    ###################################
+
+    def is_query(self, node):
+        # A call of a query builtin the program cannot have rebound
+        if type(node.node_to_call).__name__ != 'VarAccessNode':
+            return False
+
+        var_name = node.node_to_call.var_name_token.value
+
+        if var_name in self.bound_names or var_name in self.shadowed_names:
+            return False
+
+        value = self.symbol_table.get(var_name)
+
+        return type(value).__name__ == 'BuiltInFunction' and value.name in QUERY_BUILTINS
+
+    def is_number_expression(self, node):
+        node_type = type(node).__name__
+
+        if node_type == 'NumberNode':
+            return True
+
+        if node_type == 'CallNode':
+            return self.is_query(node)
+
+        if node_type == 'BinaryOperationNode':
+            return node.operation not in ARITHMETIC_OPERATIONS or self.is_number_expression(node.left_node)
+
+        if node_type == 'UnaryOperationNode':
+            return self.is_number_expression(node.node)
+
+        return False
+
+    def is_worth_hoisting(self, node):
+        return type(node).__name__ in ('BinaryOperationNode', 'UnaryOperationNode', 'CallNode')
+
+    def is_invariant(self, node, loop):
+        # Pure, reads nothing the loop changes, and cannot change anything itself
+        node_type = type(node).__name__
+
+        if node_type in ('NumberNode', 'StringNode'):
+            return True
+
+        if node_type == 'VarAccessNode':
+            var_name = node.var_name_token.value
+
+            if var_name in loop.assigned_names:
+                return False
+
+            # A called function may RUN a script that rebinds globals
+            return not loop.calls_out or (self.local_names is not None and var_name in self.local_names)
+
+        if node_type == 'BinaryOperationNode':
+            # A power can overflow or take as long as the whole program
+            if node.operation == OP_POW:
+                return False
+
+            if node.operation in LIST_MUTATING_OPERATIONS and not self.is_number_expression(node.left_node):
+                return False
+
+            # Dividing a List reads one of its elements
+            if node.operation == OP_DIV and loop.may_mutate and not self.is_number_expression(node.left_node):
+                return False
+
+            return self.is_invariant(node.left_node, loop) and self.is_invariant(node.right_node, loop)
+
+        if node_type == 'UnaryOperationNode':
+            # NOT of anything but a Number fails outside of the language's errors
+            if node.op_token.type != MINUS and not self.is_number_expression(node.node):
+                return False
+
+            return self.is_invariant(node.node, loop)
+
+        if node_type == 'CallNode':
+            if not self.is_query(node):
+                return False
+
+            if self.symbol_table.get(node.node_to_call.var_name_token.value).name == 'len' and loop.may_mutate:
+                return False
+
+            return all(self.is_invariant(arguments_node, loop) for arguments_node in node.arguments_nodes)
+
+        return False
+
+
+def is_same(new, old):
+    # Whether rewriting left a child, a list of children or an IF case untouched
+    if type(old) in (list, tuple):
+        return len(new) == len(old) and all(is_same(new_part, old_part) for new_part, old_part in zip(new, old))
+
+    return new is old
@@ -0,0 +1,110 @@
+from collections import OrderedDict
+
+from BaseFunction import BaseFunction
+from Number import Number
+from Purity import PurityChecker
+from RTResult import RTResult
+from String import String
+
+
+class MemoCache:
+    # Holds with the entries the globals the purity proof relied on, as
+    # bindings of names to values, and whether the proof holds for them
+    def __init__(self, max_size, bindings):
+        self.entries = OrderedDict()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.bindings = bindings
+        self.is_pure = True
+
+    def get(self, key):
+        value = self.entries.get(key)
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries), 'max_size': self.max_size}
+
+
+def memo_key(arguments):
+    # Only immutable arguments make a key, a List argument could be mutated by the caller
+    for argument in arguments:
+        if type(argument) is not Number and type(argument) is not String:
+            return None
+
+    return tuple((type(argument), type(argument.value), argument.value) for argument in arguments)
+
+
+class MemoizedFunction(BaseFunction):
+    def __init__(self, function, root, bindings, cache=None):
+        super().__init__(function.name)
+        self.function = function
+        self.root = root
+        self.cache = cache or MemoCache(self.max_size, bindings)
+
+    def is_pure(self, shadowed_names):
+        # The function is checked again once a global its proof relied on is
+        # rebound, or some function of a later run may shadow it
+        cache = self.cache
+        symbols = self.root.symbols
+
+        for name, value in cache.bindings.items():
+            if symbols.get(name) is not value or name in shadowed_names:
+                break
+        else:
+            return cache.is_pure
+
+        checker = PurityChecker(self.root, shadowed_names)
+        cache.is_pure = checker.check(self.function) is None
+        cache.bindings = checker.bindings
+        cache.entries.clear()
+
+        return cache.is_pure
+
+    def execute(self, arguments):
+        key = memo_key(arguments) if self.is_pure(self.context.shadowed_names) else None
+
+        if key is not None:
+            value = self.cache.get(key)
+
+            if value is not None:
+                return RTResult().success(value)
+
+        self.function.set_position(self.start_position, self.end_position).set_context(self.context)
+        res = self.function.execute(arguments)
+
+        # A cached List would be shared by every caller and could be mutated by any of them
+        if key is not None and not res.should_return() and type(res.value) in (Number, String):
+            self.cache.put(key, res.value)
+
+        return res
+
+    def cache_info(self):
+        return self.cache.info()
+
+    def copy(self):
+        copy = MemoizedFunction(self.function, self.root, None, self.cache)
+        copy.set_context(self.context)
+        copy.set_position(self.start_position, self.end_position)
+
+        return copy
+
+    def __repr__(self):
+        return repr(self.function)
+
+
+# Entries each memoized function keeps before evicting the least recently used one
+MemoizedFunction.max_size = 1024
@@ -1,3 +1,7 @@
+from Number import Number
+from Operations import HANDLERS, InlineCache, operation_of
+
+
 class ListNode:
     def __init__(self, nodes, start_position, end_position):
         self.nodes = nodes
@@ -12,6 +16,7 @@ class ListNode:
 class NumberNode:
     def __init__(self, token):
         self.token = token
+        self.value = Number(token.value)
 
         self.start_position = self.token.start_position
         self.end_position = self.token.end_position
@@ -37,6 +42,10 @@ class BinaryOperationNode:
         self.op_token = op_token
         self.right_node = right_node
 
+        self.operation = operation_of(op_token)
+        self.handlers = HANDLERS[self.operation]
+        self.cache = InlineCache(self.operation)
+
         self.start_position = self.left_node.start_position
         self.end_position = self.right_node.end_position
 
@@ -61,6 +70,8 @@ class VarAssignNode:
     def __init__(self, var_name_token, value_node):
         self.var_name_token = var_name_token
         self.value_node = value_node
+        self.slot = None
+        self.increment = None
 
         self.start_position = self.var_name_token.start_position
         self.end_position = self.value_node.end_position
@@ -72,6 +83,8 @@ class VarAssignNode:
 class VarAccessNode:
     def __init__(self, var_name_token):
         self.var_name_token = var_name_token
+        self.slot = None
+        self.is_free = False
 
         self.start_position = self.var_name_token.start_position
         self.end_position = self.var_name_token.end_position
@@ -84,6 +97,7 @@ class IfNode:
     def __init__(self, cases, else_case):
         self.cases = cases
         self.else_case = else_case
+        self.comparisons = None
 
         self.start_position = self.cases[0][0].start_position
         self.end_position = (self.else_case or self.cases[len(self.cases) - 1])[0].end_position
@@ -100,6 +114,11 @@ class ForNode:
         self.step_value_node = step_value_node
         self.body_node = body_node
         self.should_return_null = should_return_null
+        self.slot = None
+        self.lazy_names = None
+        self.hoisted_nodes = None
+        self.hoisted_names = None
+        self.hoisted_body = None
 
         self.start_position = self.var_name_token.start_position
         self.end_position = self.body_node.end_position
@@ -115,6 +134,10 @@ class WhileNode:
         self.condition_node = condition_node
         self.body_node = body_node
         self.should_return_null = should_return_null
+        self.hoisted_nodes = None
+        self.hoisted_names = None
+        self.hoisted_condition = None
+        self.hoisted_body = None
 
         self.start_position = self.condition_node.start_position
         self.end_position = self.body_node.end_position
@@ -142,6 +165,10 @@ class FuncDefinitionNode:
         self.arguments_name_tokens = arguments_name_tokens
         self.body_node = body_node
         self.should_auto_return = should_auto_return
+        self.slot = None
+        self.layout = None
+        self.call_count = 0
+        self.compiled_body = None
 
         if self.var_name_token:
             self.start_position = self.var_name_token.start_position
@@ -164,6 +191,8 @@ class CallNode:
     def __init__(self, node_to_call, arguments_nodes):
         self.node_to_call = node_to_call
         self.arguments_nodes = arguments_nodes
+        self.tail_body = None
+        self.is_append = False
 
         self.start_position = self.node_to_call.start_position
 
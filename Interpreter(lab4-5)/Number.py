@@ -11,54 +11,54 @@ class Number(Value):
 
     def get_comparison_eq(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value == other.value)).set_context(self.context), None
+            return Number.true if self.value == other.value else Number.false, None
         else:
             return None, Value.illegal_operation(self, other)
 
     def get_comparison_ne(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value != other.value)).set_context(self.context), None
+            return Number.true if self.value != other.value else Number.false, None
         else:
             return None, Value.illegal_operation(self, other)
 
     def get_comparison_lt(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value < other.value)).set_context(self.context), None
+            return Number.true if self.value < other.value else Number.false, None
         else:
             return None, Value.illegal_operation(self, other)
 
     def get_comparison_lte(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value <= other.value)).set_context(self.context), None
+            return Number.true if self.value <= other.value else Number.false, None
         else:
             return None, Value.illegal_operation(self, other)
 
     def get_comparison_gt(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value > other.value)).set_context(self.context), None
+            return Number.true if self.value > other.value else Number.false, None
         else:
             return None, Value.illegal_operation(self, other)
 
     def get_comparison_gte(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value >= other.value)).set_context(self.context), None
+            return Number.true if self.value >= other.value else Number.false, None
         else:
             return None, Value.illegal_operation(self, other)
 
     def anded_by(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value and other.value)).set_context(self.context), None
+            return make_number(int(self.value and other.value)), None
         else:
             return None, Value.illegal_operation(self, other)
 
     def ored_by(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value or other.value)).set_context(self.context), None
+            return make_number(int(self.value or other.value)), None
         else:
             return None, Value.illegal_operation(self, other)
 
     def notted(self):
-        return Number(1 if self.value == 0 else 0).set_context(self.context), None
+        return Number.true if self.value == 0 else Number.false, None
 
     def multed_by(self, other):
         if isinstance(other, Number):
@@ -117,4 +117,43 @@ class Number(Value):
 Number.null = Number(0)
 Number.false = Number(0)
 Number.true = Number(1)
-Number.math_PI = Number(math.pi)
\ No newline at end of file
+Number.math_PI = Number(math.pi)
+
+# Numbers are never mutated once they are computed, so small integers can be shared
+SMALL_INTEGER_MIN = -128
+SMALL_INTEGER_MAX = 1024
+
+Number.small_integers = [Number(value) for value in range(SMALL_INTEGER_MIN, SMALL_INTEGER_MAX)]
+Number.small_integers[-SMALL_INTEGER_MIN] = Number.false
+Number.small_integers[1 - SMALL_INTEGER_MIN] = Number.true
+
+
+def make_number(value):
+    if type(value) is int and SMALL_INTEGER_MIN <= value < SMALL_INTEGER_MAX:
+        return Number.small_integers[value - SMALL_INTEGER_MIN]
+
+    return Number(value)
+
+
+# Values a FOR counter takes, integer bounds run on a plain range
+def loop_range(start, end, step):
+    if type(start) is int and type(end) is int and type(step) is int and step != 0:
+        return range(start, end, step)
+
+    return stepped_range(start, end, step)
+
+
+def is_loop_entered(start, end, step):
+    # Whether the counter takes any value, as loop_range would give it
+    return start < end if step >= 0 else start > end
+
+
+def stepped_range(i, end, step):
+    if step >= 0:
+        while i < end:
+            yield i
+            i += step
+    else:
+        while i > end:
+            yield i
+            i += step
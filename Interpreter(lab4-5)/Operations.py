@@ -0,0 +1,193 @@
+from Number import Number, make_number
+
+#######################################
+# BINARY OPERATIONS
+#######################################
+
+OP_MUL = 0
+OP_DIV = 1
+OP_PLUS = 2
+OP_MINUS = 3
+OP_POW = 4
+OP_EE = 5
+OP_NE = 6
+OP_GT = 7
+OP_GTE = 8
+OP_LT = 9
+OP_LTE = 10
+OP_AND = 11
+OP_OR = 12
+
+# Operator token type (or keyword value for AND/OR) to operation
+OPERATIONS = {
+    'MUL': OP_MUL,
+    'DIV': OP_DIV,
+    'PLUS': OP_PLUS,
+    'MINUS': OP_MINUS,
+    'POW': OP_POW,
+    'EE': OP_EE,
+    'NE': OP_NE,
+    'GT': OP_GT,
+    'GTE': OP_GTE,
+    'LT': OP_LT,
+    'LTE': OP_LTE,
+    'AND': OP_AND,
+    'OR': OP_OR,
+}
+
+# Value method implementing each operation, in OP_* order
+OPERATION_METHODS = [
+    'multed_by',
+    'dived_by',
+    'added_to',
+    'subbed_by',
+    'powed_by',
+    'get_comparison_eq',
+    'get_comparison_ne',
+    'get_comparison_gt',
+    'get_comparison_gte',
+    'get_comparison_lt',
+    'get_comparison_lte',
+    'anded_by',
+    'ored_by',
+]
+
+COMPARISON_OPERATIONS = (OP_EE, OP_NE, OP_GT, OP_GTE, OP_LT, OP_LTE)
+
+# Python equivalents used when both operands are Numbers, in OP_* order
+NUMBER_OPERATIONS = [
+    lambda a, b: a * b,
+    lambda a, b: a / b,
+    lambda a, b: a + b,
+    lambda a, b: a - b,
+    lambda a, b: a ** b,
+    lambda a, b: int(a == b),
+    lambda a, b: int(a != b),
+    lambda a, b: int(a > b),
+    lambda a, b: int(a >= b),
+    lambda a, b: int(a < b),
+    lambda a, b: int(a <= b),
+    lambda a, b: int(a and b),
+    lambda a, b: int(a or b),
+]
+
+KEYWORD = 'KEYWORD'
+
+
+def operation_of(op_token):
+    if op_token.type == KEYWORD:
+        return OPERATIONS[op_token.value]
+
+    return OPERATIONS[op_token.type]
+
+
+def operation_error(node, context, method_name, left, right):
+    # Operands travel without positions on the fast paths, so a failing
+    # operation is replayed on copies positioned at its operand nodes
+    left = left.copy().set_context(context).set_position(node.left_node.start_position, node.left_node.end_position)
+    right = right.copy().set_context(context).set_position(node.right_node.start_position, node.right_node.end_position)
+    _, error = getattr(left, method_name)(right)
+
+    return error
+
+
+def negation_error(node, context, value):
+    # Unary minus multiplies by -1, replayed the same way as a binary operation
+    minus_one = Number(-1).set_position(node.start_position, node.end_position)
+    value = value.copy().set_context(context).set_position(node.node.start_position, node.node.end_position)
+    _, error = value.multed_by(minus_one)
+
+    return error
+
+
+#######################################
+# SPECIALIZED HANDLERS
+#######################################
+
+def specialize(operation, left_type, right_type):
+    # Number pairs skip the isinstance checks of the Value methods, everything
+    # else calls the method of the left operand's class directly
+    if left_type is Number and right_type is Number:
+        number_operation = NUMBER_OPERATIONS[operation]
+
+        if operation == OP_DIV:
+            def number_division(left, right):
+                if right.value == 0:
+                    return left.dived_by(right)
+
+                return Number(left.value / right.value), None
+
+            return number_division
+
+        def number_handler(left, right):
+            return make_number(number_operation(left.value, right.value)), None
+
+        return number_handler
+
+    return getattr(left_type, OPERATION_METHODS[operation])
+
+
+class OperationTable(dict):
+    # Handlers of one operation keyed by (left type, right type), specialized on first use
+    def __init__(self, operation):
+        super().__init__()
+        self.operation = operation
+
+    def __missing__(self, types):
+        handler = self[types] = specialize(self.operation, *types)
+        return handler
+
+
+HANDLERS = [OperationTable(operation) for operation in range(len(OPERATION_METHODS))]
+
+
+# Inline cache states
+UNINITIALIZED = 0
+MONOMORPHIC = 1
+POLYMORPHIC = 2
+MEGAMORPHIC = 3
+
+
+class InlineCache:
+    # Operand types one operation node has seen, with their handlers. The first
+    # pair is checked by the engines inline; once more than max_entries pairs
+    # are seen the node deoptimises to the generic Value methods
+    def __init__(self, operation):
+        self.operation = operation
+        self.method_name = OPERATION_METHODS[operation]
+        self.state = UNINITIALIZED
+        self.left_type = None
+        self.right_type = None
+        self.handler = None
+        self.entries = {}
+
+    def miss(self, left, right):
+        types = (type(left), type(right))
+
+        if self.state == UNINITIALIZED:
+            self.state = MONOMORPHIC
+            self.left_type, self.right_type = types
+            self.handler = self.entries[types] = HANDLERS[self.operation][types]
+
+            return self.handler(left, right)
+
+        if self.state == MEGAMORPHIC:
+            return getattr(left, self.method_name)(right)
+
+        handler = self.entries.get(types)
+
+        if handler is None:
+            if len(self.entries) >= self.max_entries:
+                self.state = MEGAMORPHIC
+                self.left_type = self.right_type = self.handler = None
+                self.entries.clear()
+
+                return getattr(left, self.method_name)(right)
+
+            self.state = POLYMORPHIC
+            handler = self.entries[types] = HANDLERS[self.operation][types]
+
+        return handler(left, right)
+
+
+InlineCache.max_entries = 4
@@ -5,6 +5,7 @@ from Nodes import ListNode, ReturnNode, ContinueNode, BreakNode, VarAssignNode,
 # from NodesTree import ListNode, ReturnNode, ContinueNode, BreakNode, VarAssignNode, UnaryOperationNode, CallNode, NumberNode, \
 #     StringNode, VarAccessNode, IfNode, ForNode, WhileNode, FuncDefinitionNode, BinaryOperationNode
 from ParseResult import ParseResult
+from TokenBuffer import TokenBuffer
 
 INT = 'INT'
 FLOAT = 'FLOAT'
@@ -57,28 +58,57 @@ KEYWORDS = [
 
 class Parser:
     def __init__(self, tokens):
-        self.current_token = None
+        self.current_type = None
+        self.current_value = None
+        self.current_index = None
+        self.token = None
         self.tokens = tokens
+        self.is_buffered = isinstance(tokens, TokenBuffer)
         self.token_index = -1
         self.advance()
 
     def update_current_token(self):
-        if 0 <= self.token_index < len(self.tokens):
-            self.current_token = self.tokens[self.token_index]
+        # A TokenBuffer gives the type and value from its arrays, the Token
+        # itself is only made when the parser keeps it or shows its position
+        if self.token_index < 0:
+            return
+
+        if self.is_buffered:
+            type_ = self.tokens.type_at(self.token_index)
+
+            if type_ is not None:
+                self.current_type = type_
+                self.current_value = self.tokens.values.get(self.token_index)
+                self.current_index = self.token_index
+                self.token = None
+
+        elif self.token_index < len(self.tokens):
+            self.token = self.tokens[self.token_index]
+            self.current_type = self.token.type
+            self.current_value = self.token.value
+            self.current_index = self.token_index
+
+    @property
+    def current_token(self):
+        if self.token is None:
+            self.token = self.tokens[self.current_index]
+
+        return self.token
+
+    def current_matches(self, type_, value):
+        return self.current_type == type_ and self.current_value == value
 
     def advance(self):
         self.token_index += 1
         self.update_current_token()
-        return self.current_token
 
     def reverse(self, amount=1):
         self.token_index -= amount
         self.update_current_token()
-        return self.current_token
 
     def parse(self):
         result = self.statements()
-        if not result.error and self.current_token.type != EOF:
+        if not result.error and self.current_type != EOF:
             return result.failure(InvalidSyntaxError(
                 self.current_token.start_position, self.current_token.end_position,
                 "token cannot appear after previous tokens"
@@ -90,9 +120,9 @@ class Parser:
     def statements(self):
         result = ParseResult()
         statements = []
-        start_position = self.current_token.start_position.copy_position()
+        start_position = self.current_token.start_position
 
-        while self.current_token.type == NEWLINE:
+        while self.current_type == NEWLINE:
             result.register_advancement()
             self.advance()
 
@@ -107,7 +137,7 @@ class Parser:
         while True:
             newline_count = 0
 
-            while self.current_token.type == NEWLINE:
+            while self.current_type == NEWLINE:
                 result.register_advancement()
                 self.advance()
                 newline_count += 1
@@ -126,13 +156,13 @@ class Parser:
                 continue
             statements.append(statement)
 
-        return result.success(ListNode(statements, start_position, self.current_token.end_position.copy_position()))
+        return result.success(ListNode(statements, start_position, self.current_token.end_position))
 
     def statement(self):
         result = ParseResult()
-        start_position = self.current_token.start_position.copy_position()
+        start_position = self.current_token.start_position
 
-        if self.current_token.matches(KEYWORD, 'RETURN'):
+        if self.current_matches(KEYWORD, 'RETURN'):
             result.register_advancement()
             self.advance()
 
@@ -142,19 +172,19 @@ class Parser:
                 self.reverse(result.to_reverse_count)
 
             return result.success(
-                ReturnNode(expression, start_position, self.current_token.start_position.copy_position()))
+                ReturnNode(expression, start_position, self.current_token.start_position))
 
-        if self.current_token.matches(KEYWORD, 'CONTINUE'):
+        if self.current_matches(KEYWORD, 'CONTINUE'):
             result.register_advancement()
             self.advance()
 
-            return result.success(ContinueNode(start_position, self.current_token.start_position.copy_position()))
+            return result.success(ContinueNode(start_position, self.current_token.start_position))
 
-        if self.current_token.matches(KEYWORD, 'BREAK'):
+        if self.current_matches(KEYWORD, 'BREAK'):
             result.register_advancement()
             self.advance()
 
-            return result.success(BreakNode(start_position, self.current_token.start_position.copy_position()))
+            return result.success(BreakNode(start_position, self.current_token.start_position))
 
         expression = result.register(self.expression())
 
@@ -170,11 +200,11 @@ class Parser:
     def expression(self):
         result = ParseResult()
 
-        if self.current_token.matches(KEYWORD, 'VAR'):
+        if self.current_matches(KEYWORD, 'VAR'):
             result.register_advancement()
             self.advance()
 
-            if self.current_token.type != IDENTIFIER:
+            if self.current_type != IDENTIFIER:
                 return result.failure(InvalidSyntaxError(
                     self.current_token.start_position, self.current_token.end_position,
                     "Expected identifier"
@@ -184,7 +214,7 @@ class Parser:
             result.register_advancement()
             self.advance()
 
-            if self.current_token.type != EQ:
+            if self.current_type != EQ:
                 return result.failure(InvalidSyntaxError(
                     self.current_token.start_position, self.current_token.end_position,
                     "Expected '='"
@@ -212,7 +242,7 @@ class Parser:
     def comp_expression(self):
         result = ParseResult()
 
-        if self.current_token.matches(KEYWORD, 'NOT'):
+        if self.current_matches(KEYWORD, 'NOT'):
             op_token = self.current_token
             result.register_advancement()
             self.advance()
@@ -242,9 +272,9 @@ class Parser:
 
     def factor(self):
         result = ParseResult()
-        token = self.current_token
 
-        if token.type in (PLUS, MINUS):
+        if self.current_type in (PLUS, MINUS):
+            token = self.current_token
             result.register_advancement()
             self.advance()
             factor = result.register(self.factor())
@@ -265,12 +295,12 @@ class Parser:
         if result.error:
             return result
 
-        if self.current_token.type == LPAREN:
+        if self.current_type == LPAREN:
             result.register_advancement()
             self.advance()
             arguments_nodes = []
 
-            if self.current_token.type == RPAREN:
+            if self.current_type == RPAREN:
                 result.register_advancement()
                 self.advance()
             else:
@@ -282,7 +312,7 @@ class Parser:
                         "'(', '[' or 'NOT'"
                     ))
 
-                while self.current_token.type == COMMA:
+                while self.current_type == COMMA:
                     result.register_advancement()
                     self.advance()
 
@@ -291,7 +321,7 @@ class Parser:
                     if result.error:
                         return result
 
-                if self.current_token.type != RPAREN:
+                if self.current_type != RPAREN:
                     return result.failure(InvalidSyntaxError(
                         self.current_token.start_position, self.current_token.end_position,
                         f"Expected ',' or ')'"
@@ -334,7 +364,7 @@ class Parser:
             if result.error:
                 return result
 
-            if self.current_token.type == RPAREN:
+            if self.current_type == RPAREN:
                 result.register_advancement()
                 self.advance()
                 return result.success(expression)
@@ -392,9 +422,9 @@ class Parser:
     def list_expression(self):
         result = ParseResult()
         element_nodes = []
-        start_position = self.current_token.start_position.copy_position()
+        start_position = self.current_token.start_position
 
-        if self.current_token.type != LSQUARE:
+        if self.current_type != LSQUARE:
             return result.failure(InvalidSyntaxError(
                 self.current_token.start_position, self.current_token.end_position,
                 f"Expected '['"
@@ -403,7 +433,7 @@ class Parser:
         result.register_advancement()
         self.advance()
 
-        if self.current_token.type == RSQUARE:
+        if self.current_type == RSQUARE:
             result.register_advancement()
             self.advance()
         else:
@@ -415,7 +445,7 @@ class Parser:
                     "'(', '[' or 'NOT'"
                 ))
 
-            while self.current_token.type == COMMA:
+            while self.current_type == COMMA:
                 result.register_advancement()
                 self.advance()
 
@@ -424,7 +454,7 @@ class Parser:
                 if result.error:
                     return result
 
-            if self.current_token.type != RSQUARE:
+            if self.current_type != RSQUARE:
                 return result.failure(InvalidSyntaxError(
                     self.current_token.start_position, self.current_token.end_position,
                     f"Expected ',' or ']'"
@@ -436,7 +466,7 @@ class Parser:
         return result.success(ListNode(
             element_nodes,
             start_position,
-            self.current_token.end_position.copy_position()
+            self.current_token.end_position
         ))
 
     def if_expression(self):
@@ -457,11 +487,11 @@ class Parser:
         result = ParseResult()
         else_case = None
 
-        if self.current_token.matches(KEYWORD, 'ELSE'):
+        if self.current_matches(KEYWORD, 'ELSE'):
             result.register_advancement()
             self.advance()
 
-            if self.current_token.type == NEWLINE:
+            if self.current_type == NEWLINE:
                 result.register_advancement()
                 self.advance()
 
@@ -472,7 +502,7 @@ class Parser:
 
                 else_case = (statements, True)
 
-                if self.current_token.matches(KEYWORD, 'END'):
+                if self.current_matches(KEYWORD, 'END'):
                     result.register_advancement()
                     self.advance()
                 else:
@@ -494,7 +524,7 @@ class Parser:
         result = ParseResult()
         cases, else_case = [], None
 
-        if self.current_token.matches(KEYWORD, 'ELIF'):
+        if self.current_matches(KEYWORD, 'ELIF'):
             all_cases = result.register(self.if_expression_b())
             if result.error:
                 return result
@@ -512,7 +542,7 @@ class Parser:
         cases = []
         else_case = None
 
-        if not self.current_token.matches(KEYWORD, case_keyword):
+        if not self.current_matches(KEYWORD, case_keyword):
             return result.failure(InvalidSyntaxError(
                 self.current_token.start_position, self.current_token.end_position,
                 f"Expected '{case_keyword}'"
@@ -526,7 +556,7 @@ class Parser:
         if result.error:
             return result
 
-        if not self.current_token.matches(KEYWORD, 'THEN'):
+        if not self.current_matches(KEYWORD, 'THEN'):
             return result.failure(InvalidSyntaxError(
                 self.current_token.start_position, self.current_token.end_position,
                 f"Expected 'THEN'"
@@ -535,7 +565,7 @@ class Parser:
         result.register_advancement()
         self.advance()
 
-        if self.current_token.type == NEWLINE:
+        if self.current_type == NEWLINE:
             result.register_advancement()
             self.advance()
 
@@ -546,7 +576,7 @@ class Parser:
 
             cases.append((condition, statements, True))
 
-            if self.current_token.matches(KEYWORD, 'END'):
+            if self.current_matches(KEYWORD, 'END'):
                 result.register_advancement()
                 self.advance()
             else:
@@ -578,7 +608,7 @@ class Parser:
     def for_expression(self):
         result = ParseResult()
 
-        if not self.current_token.matches(KEYWORD, 'FOR'):
+        if not self.current_matches(KEYWORD, 'FOR'):
             return result.failure(InvalidSyntaxError(
                 self.current_token.start_position, self.current_token.end_position,
                 f"Expected 'FOR'"
@@ -587,7 +617,7 @@ class Parser:
         result.register_advancement()
         self.advance()
 
-        if self.current_token.type != IDENTIFIER:
+        if self.current_type != IDENTIFIER:
             return result.failure(InvalidSyntaxError(
                 self.current_token.start_position, self.current_token.end_position,
                 f"Expected identifier"
@@ -597,7 +627,7 @@ class Parser:
         result.register_advancement()
         self.advance()
 
-        if self.current_token.type != EQ:
+        if self.current_type != EQ:
             return result.failure(InvalidSyntaxError(
                 self.current_token.start_position, self.current_token.end_position,
                 f"Expected '='"
@@ -611,7 +641,7 @@ class Parser:
         if result.error:
             return result
 
-        if not self.current_token.matches(KEYWORD, 'TO'):
+        if not self.current_matches(KEYWORD, 'TO'):
             return result.failure(InvalidSyntaxError(
                 self.current_token.start_position, self.current_token.end_position,
                 f"Expected 'TO'"
@@ -625,7 +655,7 @@ class Parser:
         if result.error:
             return result
 
-        if self.current_token.matches(KEYWORD, 'STEP'):
+        if self.current_matches(KEYWORD, 'STEP'):
             result.register_advancement()
             self.advance()
 
@@ -636,7 +666,7 @@ class Parser:
         else:
             step_value = None
 
-        if not self.current_token.matches(KEYWORD, 'THEN'):
+        if not self.current_matches(KEYWORD, 'THEN'):
             return result.failure(InvalidSyntaxError(
                 self.current_token.start_position, self.current_token.end_position,
                 f"Expected 'THEN'"
@@ -645,7 +675,7 @@ class Parser:
         result.register_advancement()
         self.advance()
 
-        if self.current_token.type == NEWLINE:
+        if self.current_type == NEWLINE:
             result.register_advancement()
             self.advance()
 
@@ -654,7 +684,7 @@ class Parser:
             if result.error:
                 return result
 
-            if not self.current_token.matches(KEYWORD, 'END'):
+            if not self.current_matches(KEYWORD, 'END'):
                 return result.failure(InvalidSyntaxError(
                     self.current_token.start_position, self.current_token.end_position,
                     f"Expected 'END'"
@@ -675,7 +705,7 @@ class Parser:
     def while_expression(self):
         result = ParseResult()
 
-        if not self.current_token.matches(KEYWORD, 'WHILE'):
+        if not self.current_matches(KEYWORD, 'WHILE'):
             return result.failure(InvalidSyntaxError(
                 self.current_token.start_position, self.current_token.end_position,
                 f"Expected 'WHILE'"
@@ -689,7 +719,7 @@ class Parser:
         if result.error:
             return result
 
-        if not self.current_token.matches(KEYWORD, 'THEN'):
+        if not self.current_matches(KEYWORD, 'THEN'):
             return result.failure(InvalidSyntaxError(
                 self.current_token.start_position, self.current_token.end_position,
                 f"Expected 'THEN'"
@@ -698,7 +728,7 @@ class Parser:
         result.register_advancement()
         self.advance()
 
-        if self.current_token.type == NEWLINE:
+        if self.current_type == NEWLINE:
             result.register_advancement()
             self.advance()
 
@@ -707,7 +737,7 @@ class Parser:
             if result.error:
                 return result
 
-            if not self.current_token.matches(KEYWORD, 'END'):
+            if not self.current_matches(KEYWORD, 'END'):
                 return result.failure(InvalidSyntaxError(
                     self.current_token.start_position, self.current_token.end_position,
                     f"Expected 'END'"
@@ -728,7 +758,7 @@ class Parser:
     def func_definition(self):
         result = ParseResult()
 
-        if not self.current_token.matches(KEYWORD, 'FUN'):
+        if not self.current_matches(KEYWORD, 'FUN'):
             return result.failure(InvalidSyntaxError(
                 self.current_token.start_position, self.current_token.end_position,
                 f"Expected 'FUN'"
@@ -737,12 +767,12 @@ class Parser:
         result.register_advancement()
         self.advance()
 
-        if self.current_token.type == IDENTIFIER:
+        if self.current_type == IDENTIFIER:
             var_name_token = self.current_token
             result.register_advancement()
             self.advance()
 
-            if self.current_token.type != LPAREN:
+            if self.current_type != LPAREN:
                 return result.failure(InvalidSyntaxError(
                     self.current_token.start_position, self.current_token.end_position,
                     f"Expected '('"
@@ -750,7 +780,7 @@ class Parser:
         else:
             var_name_token = None
 
-            if self.current_token.type != LPAREN:
+            if self.current_type != LPAREN:
                 return result.failure(InvalidSyntaxError(
                     self.current_token.start_position, self.current_token.end_position,
                     f"Expected identifier or '('"
@@ -760,16 +790,16 @@ class Parser:
         self.advance()
         arguments_name_tokens = []
 
-        if self.current_token.type == IDENTIFIER:
+        if self.current_type == IDENTIFIER:
             arguments_name_tokens.append(self.current_token)
             result.register_advancement()
             self.advance()
 
-            while self.current_token.type == COMMA:
+            while self.current_type == COMMA:
                 result.register_advancement()
                 self.advance()
 
-                if self.current_token.type != IDENTIFIER:
+                if self.current_type != IDENTIFIER:
                     return result.failure(InvalidSyntaxError(
                         self.current_token.start_position, self.current_token.end_position,
                         f"Expected identifier"
@@ -779,13 +809,13 @@ class Parser:
                 result.register_advancement()
                 self.advance()
 
-            if self.current_token.type != RPAREN:
+            if self.current_type != RPAREN:
                 return result.failure(InvalidSyntaxError(
                     self.current_token.start_position, self.current_token.end_position,
                     f"Expected ',' or ')'"
                 ))
         else:
-            if self.current_token.type != RPAREN:
+            if self.current_type != RPAREN:
                 return result.failure(InvalidSyntaxError(
                     self.current_token.start_position, self.current_token.end_position,
                     f"Expected identifier or ')'"
@@ -794,7 +824,7 @@ class Parser:
         result.register_advancement()
         self.advance()
 
-        if self.current_token.type == ARROW:
+        if self.current_type == ARROW:
             result.register_advancement()
             self.advance()
 
@@ -810,7 +840,7 @@ class Parser:
                 True
             ))
 
-        if self.current_token.type != NEWLINE:
+        if self.current_type != NEWLINE:
             return result.failure(InvalidSyntaxError(
                 self.current_token.start_position, self.current_token.end_position,
                 f"Expected '->' or NEWLINE"
@@ -824,7 +854,7 @@ class Parser:
         if result.error:
             return result
 
-        if not self.current_token.matches(KEYWORD, 'END'):
+        if not self.current_matches(KEYWORD, 'END'):
             return result.failure(InvalidSyntaxError(
                 self.current_token.start_position, self.current_token.end_position,
                 f"Expected 'END'"
@@ -853,7 +883,7 @@ class Parser:
         if result.error:
             return result
 
-        while self.current_token.type in ops or (self.current_token.type, self.current_token.value) in ops:
+        while self.current_type in ops or (self.current_type, self.current_value) in ops:
             op_token = self.current_token
             result.register_advancement()
             self.advance()
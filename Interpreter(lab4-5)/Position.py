@@ -1,20 +1,94 @@
+from bisect import bisect_right
+
+
+class Source:
+    # A program's text. The offsets its lines start at are found the first
+    # time a position in it has to be shown as a line and a column
+    def __init__(self, function, text):
+        self.function = function
+        self.text = text
+        self.line_starts = None
+
+    def line_of(self, index):
+        if self.line_starts is None:
+            self.line_starts = [0]
+            newline_index = self.text.find('\n')
+
+            while newline_index >= 0:
+                self.line_starts.append(newline_index + 1)
+                newline_index = self.text.find('\n', newline_index + 1)
+
+        return bisect_right(self.line_starts, index) - 1
+
+
 class Position:
-    def __init__(self, index, line, colon, function, function_text):
+    def __init__(self, index, source, is_end=False):
         self.index = index
-        self.line = line
-        self.colon = colon
+        self.source = source
+        self.is_end = is_end
+
+    @property
+    def line(self):
+        # An end position follows the last character it covers and stays on its line
+        if self.is_end and self.index > 0:
+            return self.source.line_of(self.index - 1)
+
+        return self.source.line_of(self.index)
+
+    @property
+    def colon(self):
+        # Finding the line builds the line starts
+        line = self.line
+
+        return self.index - self.source.line_starts[line]
+
+
+class StreamSource(Source):
+    # The text of a program read in chunks, joined when a position has to be shown
+    def __init__(self, function):
         self.function = function
-        self.function_text = function_text
+        self.chunks = []
+        self.joined_text = ''
+        self.line_starts = None
+
+    def append(self, chunk):
+        self.chunks.append(chunk)
+        self.line_starts = None
+
+    @property
+    def text(self):
+        if self.chunks:
+            self.joined_text += ''.join(self.chunks)
+            self.chunks = []
+
+        return self.joined_text
+
+
+class MappedSource(Source):
+    # A memory mapped ASCII file. The map stays open as long as the source,
+    # and showing a position decodes only the lines it is on
+    def __init__(self, function, mapped):
+        self.function = function
+        self.text = MappedText(mapped)
+        self.line_starts = None
+
+    def append(self, chunk):
+        pass
+
+
+class MappedText:
+    # Reads a memory map the way positions and errors read a program's text
+    def __init__(self, mapped):
+        self.mapped = mapped
 
-    def next_character(self, current_character=None):
-        self.index += 1
-        self.colon += 1
+    def find(self, sub, start=0, end=None):
+        return self.mapped.find(sub.encode('ascii'), start, len(self.mapped) if end is None else end)
 
-        if current_character == '\n':
-            self.line += 1
-            self.colon = 0
+    def rfind(self, sub, start=0, end=None):
+        return self.mapped.rfind(sub.encode('ascii'), start, len(self.mapped) if end is None else end)
 
-        return self
+    def __getitem__(self, index):
+        return self.mapped[index].decode('ascii')
 
-    def copy_position(self):
-        return Position(self.index, self.line, self.colon, self.function, self.function_text)
+    def __len__(self):
+        return len(self.mapped)
@@ -0,0 +1,224 @@
+from Resolver import collect_assigned_names, function_signature, walk
+
+# Globals a pure function may read
+PURE_CONSTANTS = {'NULL', 'FALSE', 'TRUE', 'MATH_PI'}
+
+# Builtins a pure function may call
+PURE_BUILTINS = {'len', 'is_number', 'is_string', 'is_function', 'is_list', 'print_ret'}
+
+# Builtins that change the List they are given. A pure function may only call
+# them on a local it always assigns a List it makes itself
+LIST_MUTATING_BUILTINS = {'append', 'pop', 'extend'}
+
+
+class Impure(Exception):
+    pass
+
+
+def own_list_names(body_node, arguments_names):
+    # Locals every assignment gives a List created right there
+    is_own_list = {}
+
+    for node in walk(body_node):
+        node_type = type(node).__name__
+
+        if node_type == 'VarAssignNode':
+            name = node.var_name_token.value
+            is_new_list = type(node.value_node).__name__ in ('ListNode', 'ForNode', 'WhileNode')
+            is_own_list[name] = is_own_list.get(name, True) and is_new_list
+        elif node_type == 'ForNode':
+            is_own_list[node.var_name_token.value] = False
+
+    return {name for name, is_own in is_own_list.items() if is_own and name not in arguments_names}
+
+
+class PurityChecker:
+    # Proves that a function reads nothing but its arguments, locals it assigned
+    # first, constants and other pure functions, and has no effect on its caller.
+    # bindings collects the globals the proof relies on and their values
+    def __init__(self, root, shadowed_names, checking=None, bindings=None):
+        self.root = root
+        self.shadowed_names = shadowed_names
+        self.checking = checking if checking is not None else set()
+        self.bindings = bindings if bindings is not None else {}
+        self.local_names = set()
+        self.own_list_names = set()
+        self.loop_depth = 0
+
+    def check(self, function):
+        # Returns the reason the function is impure, or None
+        try:
+            self.check_function(function)
+        except Impure as impure:
+            return str(impure)
+
+        return None
+
+    def check_function(self, function):
+        signature = function_signature(function)
+
+        if signature is None:
+            raise Impure('is not a user function')
+
+        body_node, arguments_names = signature
+
+        if id(body_node) in self.checking:
+            return
+
+        self.checking.add(id(body_node))
+
+        checker = PurityChecker(self.root, self.shadowed_names, self.checking, self.bindings)
+        checker.local_names = set(arguments_names) | set(collect_assigned_names(body_node))
+        checker.own_list_names = own_list_names(body_node, arguments_names)
+        checker.visit_method(body_node, set(arguments_names))
+
+    def check_free_name(self, name, is_called):
+        if name in self.shadowed_names:
+            raise Impure(f"uses '{name}', which a caller may shadow")
+
+        value = self.root.symbols.get(name)
+        self.bindings[name] = value
+
+        if not is_called:
+            if name not in PURE_CONSTANTS:
+                raise Impure(f"reads global '{name}'")
+
+            return
+
+        if type(value).__name__ == 'BuiltInFunction':
+            if value.name not in PURE_BUILTINS and value.name not in LIST_MUTATING_BUILTINS:
+                raise Impure(f"calls '{name}'")
+
+        elif type(value).__name__ == 'MemoizedFunction':
+            # Its own proof relies on globals too, which this proof has to record
+            self.check_function(value.function)
+
+        else:
+            if function_signature(value) is None:
+                raise Impure(f"calls '{name}'")
+
+            self.check_function(value)
+
+    def is_list_mutating(self, name):
+        value = self.root.symbols.get(name)
+
+        return type(value).__name__ == 'BuiltInFunction' and value.name in LIST_MUTATING_BUILTINS
+
+    ###################################
+
+    def visit_method(self, node, assigned):
+        method_name = f'visit_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_visit_method)
+
+        return method(node, assigned)
+
+    def no_visit_method(self, node, assigned):
+        raise Exception(f'No visit_{type(node).__name__} method defined')
+
+    ###################################
+
+    # assigned holds the locals certainly set at this point. Reading any other
+    # local would fall back to the caller's frame
+
+    def visit_ListNode(self, node, assigned):
+        for element_node in node.nodes:
+            self.visit_method(element_node, assigned)
+
+    def visit_NumberNode(self, node, assigned):
+        pass
+
+    def visit_StringNode(self, node, assigned):
+        pass
+
+    def visit_BinaryOperationNode(self, node, assigned):
+        self.visit_method(node.left_node, assigned)
+        self.visit_method(node.right_node, assigned)
+
+    def visit_UnaryOperationNode(self, node, assigned):
+        self.visit_method(node.node, assigned)
+
+    def visit_VarAccessNode(self, node, assigned):
+        var_name = node.var_name_token.value
+
+        if var_name not in self.local_names:
+            self.check_free_name(var_name, False)
+        elif var_name not in assigned:
+            raise Impure(f"may read '{var_name}' before assigning it")
+
+    def visit_VarAssignNode(self, node, assigned):
+        self.visit_method(node.value_node, assigned)
+        assigned.add(node.var_name_token.value)
+
+    def visit_IfNode(self, node, assigned):
+        outcomes = []
+
+        for condition, expr, _ in node.cases:
+            self.visit_method(condition, assigned)
+            branch = set(assigned)
+            self.visit_method(expr, branch)
+            outcomes.append(branch)
+
+        if node.else_case:
+            branch = set(assigned)
+            self.visit_method(node.else_case[0], branch)
+            outcomes.append(branch)
+        else:
+            outcomes.append(set(assigned))
+
+        assigned.update(set.intersection(*outcomes))
+
+    def visit_ForNode(self, node, assigned):
+        self.visit_method(node.start_value_node, assigned)
+        self.visit_method(node.end_value_node, assigned)
+
+        if node.step_value_node:
+            self.visit_method(node.step_value_node, assigned)
+
+        self.loop_depth += 1
+        self.visit_method(node.body_node, assigned | {node.var_name_token.value})
+        self.loop_depth -= 1
+
+    def visit_WhileNode(self, node, assigned):
+        self.visit_method(node.condition_node, assigned)
+
+        self.loop_depth += 1
+        self.visit_method(node.body_node, set(assigned))
+        self.loop_depth -= 1
+
+    def visit_ContinueNode(self, node, assigned):
+        if not self.loop_depth:
+            raise Impure('CONTINUE leaves the function')
+
+    def visit_BreakNode(self, node, assigned):
+        if not self.loop_depth:
+            raise Impure('BREAK leaves the function')
+
+    def visit_FuncDefinitionNode(self, node, assigned):
+        raise Impure('defines a function')
+
+    def visit_CallNode(self, node, assigned):
+        node_to_call = node.node_to_call
+
+        if type(node_to_call).__name__ != 'VarAccessNode':
+            raise Impure('calls a computed value')
+
+        var_name = node_to_call.var_name_token.value
+
+        if var_name in self.local_names:
+            raise Impure(f"calls local '{var_name}'")
+
+        self.check_free_name(var_name, True)
+
+        if self.is_list_mutating(var_name):
+            target_node = node.arguments_nodes[0] if node.arguments_nodes else None
+
+            if type(target_node).__name__ != 'VarAccessNode' or \
+                    target_node.var_name_token.value not in self.own_list_names:
+                raise Impure(f"calls '{var_name}' on a List it did not create")
+
+        for arguments_node in node.arguments_nodes:
+            self.visit_method(arguments_node, assigned)
+
+    def visit_ReturnNode(self, node, assigned):
+        if node.node_to_return:
+            self.visit_method(node.node_to_return, assigned)
@@ -0,0 +1,302 @@
+from LazyList import lazy_names
+from Operations import OP_PLUS, OP_MINUS, COMPARISON_OPERATIONS, NUMBER_OPERATIONS
+
+
+class Resolver:
+    def __init__(self):
+        self.layout = None
+        self.function = None
+
+    def resolve(self, node):
+        self.visit_method(node)
+        return node
+
+    ###################################
+
+    def visit_method(self, node):
+        method_name = f'visit_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_visit_method)
+
+        return method(node)
+
+    def no_visit_method(self, node):
+        raise Exception(f'No visit_{type(node).__name__} method defined')
+
+    ###################################
+
+    def visit_ListNode(self, node):
+        for element_node in node.nodes:
+            self.visit_method(element_node)
+
+    def visit_NumberNode(self, node):
+        pass
+
+    def visit_StringNode(self, node):
+        pass
+
+    def visit_BinaryOperationNode(self, node):
+        self.visit_method(node.left_node)
+        self.visit_method(node.right_node)
+
+    def visit_UnaryOperationNode(self, node):
+        self.visit_method(node.node)
+
+    def visit_VarAccessNode(self, node):
+        var_name = node.var_name_token.value
+
+        if self.layout and var_name in self.layout:
+            node.slot = self.layout[var_name]
+        else:
+            node.is_free = True
+
+    def visit_VarAssignNode(self, node):
+        self.visit_method(node.value_node)
+        node.increment = increment_of(node)
+
+        if self.layout:
+            node.slot = self.layout[node.var_name_token.value]
+
+    def visit_IfNode(self, node):
+        node.comparisons = [constant_comparison(condition) for condition, _, _ in node.cases]
+
+        for condition, expr, _ in node.cases:
+            self.visit_method(condition)
+            self.visit_method(expr)
+
+        if node.else_case:
+            self.visit_method(node.else_case[0])
+
+    def visit_ForNode(self, node):
+        self.visit_method(node.start_value_node)
+        self.visit_method(node.end_value_node)
+
+        if node.step_value_node:
+            self.visit_method(node.step_value_node)
+
+        if self.layout:
+            node.slot = self.layout[node.var_name_token.value]
+
+        node.lazy_names = lazy_names(node)
+        self.visit_method(node.body_node)
+        self.visit_hoisted(node)
+
+    def visit_WhileNode(self, node):
+        self.visit_method(node.condition_node)
+        self.visit_method(node.body_node)
+        self.visit_hoisted(node)
+
+        if node.hoisted_condition:
+            self.visit_method(node.hoisted_condition)
+
+    def visit_ContinueNode(self, node):
+        pass
+
+    def visit_BreakNode(self, node):
+        pass
+
+    def visit_FuncDefinitionNode(self, node):
+        if node.var_name_token and self.layout:
+            node.slot = self.layout[node.var_name_token.value]
+
+        local_names = []
+
+        for local_name in [arguments_name.value for arguments_name in node.arguments_name_tokens] + \
+                collect_assigned_names(node.body_node):
+            if local_name not in local_names:
+                local_names.append(local_name)
+
+        node.layout = {local_name: slot for slot, local_name in enumerate(local_names)}
+
+        outer_layout, outer_function = self.layout, self.function
+        self.layout, self.function = node.layout, node
+
+        if node.should_auto_return:
+            self.mark_tail_call(node.body_node)
+
+        self.visit_method(node.body_node)
+        self.layout, self.function = outer_layout, outer_function
+
+    def visit_CallNode(self, node):
+        node.is_append = type(node.node_to_call).__name__ == 'VarAccessNode' and \
+            node.node_to_call.var_name_token.value == 'APPEND' and len(node.arguments_nodes) == 2
+        self.visit_method(node.node_to_call)
+
+        for arguments_node in node.arguments_nodes:
+            self.visit_method(arguments_node)
+
+    def visit_ReturnNode(self, node):
+        if node.node_to_return:
+            if self.function:
+                self.mark_tail_call(node.node_to_return)
+
+            self.visit_method(node.node_to_return)
+
+    ###################################
+
+    def visit_hoisted(self, node):
+        # The copy of a loop body reading precomputed values shares most nodes with the body
+        if node.hoisted_nodes:
+            for hoisted_node in node.hoisted_nodes:
+                self.visit_method(hoisted_node)
+
+            self.visit_method(node.hoisted_body)
+
+    def mark_tail_call(self, node):
+        # A call of the enclosing function by name whose result is returned as is
+        node_type = type(node).__name__
+
+        if node_type == 'CallNode':
+            function_name = self.function.var_name_token and self.function.var_name_token.value
+
+            if type(node.node_to_call).__name__ == 'VarAccessNode' and \
+                    node.node_to_call.var_name_token.value == function_name:
+                node.tail_body = self.function.body_node
+
+        elif node_type == 'IfNode':
+            for _, expr, should_return_null in node.cases:
+                if not should_return_null:
+                    self.mark_tail_call(expr)
+
+            if node.else_case and not node.else_case[1]:
+                self.mark_tail_call(node.else_case[0])
+
+
+def increment_of(node):
+    # VAR x = x + c and VAR x = x - c, run by the tree walker as one step when x is a Number
+    value_node = node.value_node
+
+    if type(value_node).__name__ != 'BinaryOperationNode' or value_node.operation not in (OP_PLUS, OP_MINUS):
+        return None
+
+    left_node, right_node = value_node.left_node, value_node.right_node
+
+    if type(left_node).__name__ != 'VarAccessNode' or type(right_node).__name__ != 'NumberNode' or \
+            left_node.var_name_token.value != node.var_name_token.value:
+        return None
+
+    return right_node.value.value if value_node.operation == OP_PLUS else -right_node.value.value
+
+
+def constant_comparison(node):
+    # IF x < c and the other comparisons with a number on the right
+    if type(node).__name__ != 'BinaryOperationNode' or node.operation not in COMPARISON_OPERATIONS or \
+            type(node.right_node).__name__ != 'NumberNode':
+        return None
+
+    return NUMBER_OPERATIONS[node.operation], node.right_node.value.value
+
+
+def function_signature(function):
+    # Body and parameters of a user function of any backend, None for builtins
+    code = getattr(function, 'code', None)
+
+    if code is not None:
+        return code.body_node, code.arguments_names
+
+    body_node = getattr(function, 'body_node', None)
+
+    if body_node is None:
+        return None
+
+    return body_node, function.arguments_names
+
+
+def collect_shadowed_names(node, symbols):
+    # Names any function of the program, or one an earlier run left in the
+    # root table, binds in its own frame. A name outside this set can only
+    # ever be found in the root table, whatever the dynamic call chain
+    names = set()
+    collect_local_names(node, names)
+
+    values = list(symbols.values())
+    seen = set()
+
+    while values:
+        value = values.pop()
+
+        if id(value) in seen:
+            continue
+
+        seen.add(id(value))
+        value_type = type(value).__name__
+
+        if value_type == 'List':
+            values.extend(value.elements)
+        elif value_type == 'MemoizedFunction':
+            values.append(value.function)
+        else:
+            signature = function_signature(value)
+
+            if signature is not None:
+                body_node, arguments_names = signature
+                names.update(arguments_names)
+                names.update(collect_assigned_names(body_node))
+                collect_local_names(body_node, names)
+
+    return names
+
+
+def collect_local_names(node, names):
+    # Locals of every function defined below the node, however deeply nested
+    for inner_node in walk(node):
+        if type(inner_node).__name__ == 'FuncDefinitionNode':
+            names.update(arguments_name.value for arguments_name in inner_node.arguments_name_tokens)
+            names.update(collect_assigned_names(inner_node.body_node))
+            collect_local_names(inner_node.body_node, names)
+
+
+def collect_assigned_names(node, names=None):
+    # Names a function body binds in its own frame, nested function bodies excluded
+    if names is None:
+        names = []
+
+    node_type = type(node).__name__
+
+    if node_type in ('VarAssignNode', 'ForNode', 'FuncDefinitionNode') and node.var_name_token:
+        if node.var_name_token.value not in names:
+            names.append(node.var_name_token.value)
+
+    for child in child_nodes(node):
+        collect_assigned_names(child, names)
+
+    return names
+
+
+def child_nodes(node):
+    # Subexpressions and statements of a node, a function body is not part of its definition
+    node_type = type(node).__name__
+
+    if node_type == 'ListNode':
+        children = node.nodes
+    elif node_type == 'BinaryOperationNode':
+        children = [node.left_node, node.right_node]
+    elif node_type == 'UnaryOperationNode':
+        children = [node.node]
+    elif node_type == 'VarAssignNode':
+        children = [node.value_node]
+    elif node_type == 'IfNode':
+        children = [part for case in node.cases for part in case[:2]]
+        if node.else_case:
+            children.append(node.else_case[0])
+    elif node_type == 'ForNode':
+        children = [node.start_value_node, node.end_value_node, node.step_value_node, node.body_node]
+        children += node.hoisted_nodes or []
+    elif node_type == 'WhileNode':
+        children = [node.condition_node, node.body_node]
+        children += node.hoisted_nodes or []
+    elif node_type == 'CallNode':
+        children = [node.node_to_call] + node.arguments_nodes
+    elif node_type == 'ReturnNode':
+        children = [node.node_to_return]
+    else:
+        children = []
+
+    return [child for child in children if child is not None]
+
+
+def walk(node):
+    # The node and everything below it that runs in the same frame
+    yield node
+
+    for child in child_nodes(node):
+        yield from walk(child)
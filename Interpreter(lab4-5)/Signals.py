@@ -0,0 +1,24 @@
+class ErrorSignal(Exception):
+    def __init__(self, error):
+        super().__init__(error.details)
+        self.error = error
+
+
+class ReturnSignal(Exception):
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+
+class TailCallSignal(Exception):
+    def __init__(self, arguments):
+        super().__init__()
+        self.arguments = arguments
+
+
+class BreakSignal(Exception):
+    pass
+
+
+class ContinueSignal(Exception):
+    pass
@@ -2,6 +2,7 @@ class SymbolTable:
     def __init__(self, parent=None):
         self.symbols = {}
         self.parent = parent
+        self.root = parent.root if parent else self
 
     def remove(self, name):
         del self.symbols[name]
@@ -16,3 +17,34 @@ class SymbolTable:
             return self.parent.get(name)
 
         return value
+
+
+class SlottedSymbolTable(SymbolTable):
+    # Names resolved to slots live in an array, anything else falls back to the dict
+    def __init__(self, parent, layout):
+        super().__init__(parent)
+        self.layout = layout
+        self.slots = [None] * len(layout)
+
+    def remove(self, name):
+        if name in self.layout:
+            self.slots[self.layout[name]] = None
+        else:
+            del self.symbols[name]
+
+    def set(self, name, value):
+        if name in self.layout:
+            self.slots[self.layout[name]] = value
+        else:
+            self.symbols[name] = value
+
+    def get(self, name):
+        if name in self.layout:
+            value = self.slots[self.layout[name]]
+        else:
+            value = self.symbols.get(name, None)
+
+        if value is None and self.parent:
+            return self.parent.get(name)
+
+        return value
@@ -0,0 +1,55 @@
+import time
+
+from ClosureCompiler import ClosureCompiler
+from Resolver import walk
+
+
+class Tiering:
+    # Counts calls of tree-walked functions and compiles the bodies that get
+    # hot with the closure compiler. Top-level code is never compiled
+    def __init__(self):
+        self.enabled = True
+        self.threshold = self.default_threshold
+        self.functions_tiered = 0
+        self.compile_time = 0.0
+
+    def compiled_body(self, definition):
+        # The compiled body of a definition, None while it should stay in the tree walker
+        if definition.compiled_body is None:
+            definition.call_count += 1
+
+            if not self.enabled or definition.call_count < self.threshold:
+                return None
+
+            definition.compiled_body = self.compile(definition)
+
+        return definition.compiled_body or None
+
+    def compile(self, definition):
+        body_node = definition.body_node
+
+        # The tree walker runs self tail calls as a loop, the closure compiler would recurse
+        if any(type(node).__name__ == 'CallNode' and node.tail_body is body_node for node in walk(body_node)):
+            return False
+
+        start = time.perf_counter()
+        compiler = ClosureCompiler()
+        body = compiler.visit_method(body_node) if definition.should_auto_return else compiler.discard(body_node)
+        self.compile_time += time.perf_counter() - start
+        self.functions_tiered += 1
+
+        return body
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'threshold': self.threshold,
+            'functions_tiered': self.functions_tiered,
+            'compile_time': self.compile_time,
+        }
+
+
+# Calls before a function body is compiled
+Tiering.default_threshold = 50
+
+tiering = Tiering()
@@ -1,15 +1,21 @@
+from Position import Position
+
+
 class Token:
-    def __init__(self, type_, value=None, start_position=None, end_position=None):
+    def __init__(self, type_, value=None, start=0, end=0, source=None):
         self.type = type_
         self.value = value
+        self.start = start
+        self.end = end
+        self.source = source
 
-        if start_position:
-            self.start_position = start_position.copy_position()
-            self.end_position = start_position.copy_position()
-            self.end_position.next_character()
+    @property
+    def start_position(self):
+        return Position(self.start, self.source)
 
-        if end_position:
-            self.end_position = end_position.copy_position()
+    @property
+    def end_position(self):
+        return Position(self.end, self.source, True)
 
     def matches(self, type_, value):
         return self.type == type_ and self.value == value
@@ -0,0 +1,116 @@
+from array import array
+from itertools import islice
+
+from Token import Token
+
+# Every token type, a token's type is stored as its index here
+TOKEN_TYPES = (
+    'INT',
+    'FLOAT',
+    'STRING',
+    'IDENTIFIER',
+    'KEYWORD',
+    'PLUS',
+    'MINUS',
+    'MUL',
+    'DIV',
+    'POW',
+    'EQ',
+    'LPAREN',
+    'RPAREN',
+    'LSQUARE',
+    'RSQUARE',
+    'EE',
+    'NE',
+    'LT',
+    'GT',
+    'LTE',
+    'GTE',
+    'COMMA',
+    'ARROW',
+    'NEWLINE',
+    'EOF',
+)
+
+TYPE_CODES = {type_: code for code, type_ in enumerate(TOKEN_TYPES)}
+
+
+class TokenBuffer:
+    # The tokens of one program kept in flat arrays. Only the tokens that
+    # have a value, names, keywords and literals, keep it in a side table.
+    # A Token is made when the parser reaches its index
+    def __init__(self, source):
+        self.source = source
+        self.types = array('B')
+        self.starts = array('l')
+        self.ends = array('l')
+        self.values = {}
+
+    def add(self, type_, value, start, end):
+        if value is not None:
+            self.values[len(self.types)] = value
+
+        self.types.append(TYPE_CODES[type_])
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def type_at(self, index):
+        # The type of the token at the index, None past the last token
+        if index < len(self.types):
+            return TOKEN_TYPES[self.types[index]]
+
+    def __getitem__(self, index):
+        return Token(
+            TOKEN_TYPES[self.types[index]], self.values.get(index), self.starts[index], self.ends[index], self.source
+        )
+
+    def __len__(self):
+        return len(self.types)
+
+
+class TokenStream(TokenBuffer):
+    # A TokenBuffer the lexer fills as the parser reaches new tokens. If the
+    # lexer fails, an EOF token is put where it stopped, so the parser ends
+    # there and its caller can report the lexer's error
+    def __init__(self, lexer):
+        super().__init__(lexer.source)
+        self.lexer = lexer
+        self.scanned = lexer.scan()
+        self.is_finished = False
+
+    def read(self, index):
+        while index >= len(self.types) and not self.is_finished:
+            count = len(self.types)
+
+            for type_, value, start, end in islice(self.scanned, self.read_ahead):
+                self.add(type_, value, start, end)
+
+            if len(self.types) - count < self.read_ahead:
+                self.is_finished = True
+
+                if self.lexer.error:
+                    start = self.lexer.error.start_position.index
+                    self.add('EOF', None, start, start + 1)
+
+    def read_all(self):
+        while not self.is_finished:
+            self.read(len(self.types))
+
+    def type_at(self, index):
+        self.read(index)
+        return super().type_at(index)
+
+    def __getitem__(self, index):
+        self.read(index)
+        return super().__getitem__(index)
+
+    def __len__(self):
+        # Until the lexer is done there is always one more token to read
+        if self.is_finished:
+            return len(self.types)
+
+        return len(self.types) + 1
+
+
+# Tokens lexed at a time, a chunk of the input is only read when they run out
+TokenStream.read_ahead = 256
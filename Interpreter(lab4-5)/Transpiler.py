@@ -0,0 +1,539 @@
+import re
+
+from ClosureCompiler import ClosureCompiler, ClosureFunction
+from Context import Context
+from Errors import RTError
+from List import List
+from Nodes import ListNode, CallNode
+from Number import Number, make_number, loop_range
+from Operations import OP_DIV, OPERATION_METHODS, NUMBER_OPERATIONS, operation_error, negation_error
+from RTResult import RTResult
+from Signals import ErrorSignal, BreakSignal, ContinueSignal
+from String import String
+from SymbolTable import SymbolTable
+
+MINUS = 'MINUS'
+
+# Temporaries and constants can be read at any point without side effects
+TRIVIAL = re.compile(r'_[tc]\d+|_null')
+
+
+class TranspiledFunction(ClosureFunction):
+    # The body is a generated Python function that returns the call result itself
+
+    def call(self, arguments, context, entry_position):
+        execute_context = Context(self.name, context, entry_position)
+        execute_context.symbol_table = SymbolTable(context.symbol_table)
+
+        for arguments_name, arguments_value in zip(self.arguments_names, arguments):
+            execute_context.symbol_table.symbols[arguments_name] = arguments_value
+
+        return self.body(execute_context)
+
+    def copy(self):
+        copy = TranspiledFunction(self.name, self.body, self.arguments_names, self.should_auto_return, self.body_node)
+        copy.set_context(self.context)
+        copy.set_position(self.start_position, self.end_position)
+
+        return copy
+
+
+#######################################
+# RUNTIME
+#######################################
+
+def load(context, name, node):
+    value = context.symbol_table.get(name)
+
+    if value is None:
+        raise ErrorSignal(RTError(
+            node.start_position, node.end_position,
+            f"'{name}' is not defined",
+            context
+        ))
+
+    return value
+
+
+def make_operation(operation):
+    method_name = OPERATION_METHODS[operation]
+    number_operation = NUMBER_OPERATIONS[operation]
+
+    def binary_operation(left, right, node, context):
+        if type(left) is Number and type(right) is Number:
+            return make_number(number_operation(left.value, right.value))
+
+        cache = node.cache
+
+        if type(left) is cache.left_type and type(right) is cache.right_type:
+            result, error = cache.handler(left, right)
+        else:
+            result, error = cache.miss(left, right)
+
+        if error:
+            raise ErrorSignal(operation_error(node, context, method_name, left, right))
+
+        return result
+
+    return binary_operation
+
+
+def divide(left, right, node, context):
+    if type(right) is Number:
+        if type(left) is Number and right.value != 0:
+            return Number(left.value / right.value)
+
+        if type(left) is List:
+            # List indexing is plain subscripting, bounds errors are reported at the index
+            try:
+                return left.elements[right.value]
+            except Exception:
+                pass
+
+    result, error = left.dived_by(right)
+
+    if error:
+        raise ErrorSignal(operation_error(node, context, 'dived_by', left, right))
+
+    return result
+
+
+def negative(value, node, context):
+    if type(value) is Number:
+        return make_number(-value.value)
+
+    result, error = value.multed_by(Number(-1))
+
+    if error:
+        raise ErrorSignal(negation_error(node, context, value))
+
+    return result
+
+
+def notted(value):
+    result, _ = value.notted()
+    return result
+
+
+def call(value_to_call, arguments, context, node):
+    if type(value_to_call) is TranspiledFunction and len(arguments) == len(value_to_call.arguments_names):
+        return value_to_call.call(arguments, context, node.start_position)
+
+    value_to_call = value_to_call.copy().set_position(node.start_position, node.end_position)
+    value_to_call.set_context(context)
+    res = value_to_call.execute(arguments)
+
+    if res.error:
+        raise ErrorSignal(res.error)
+    if res.loop_should_break:
+        raise BreakSignal()
+    if res.loop_should_continue:
+        raise ContinueSignal()
+
+    return res.value
+
+
+def make_function(name, body, arguments_names, should_auto_return, body_node, context, node):
+    func_value = TranspiledFunction(name, body, arguments_names, should_auto_return, body_node)
+    return func_value.set_context(context).set_position(node.start_position, node.end_position)
+
+
+RUNTIME = {
+    'List': List,
+    '_number': make_number,
+    '_null': Number.null,
+    '_load': load,
+    '_divide': divide,
+    '_negative': negative,
+    '_notted': notted,
+    '_range': loop_range,
+    '_call': call,
+    '_make_function': make_function,
+    '_Break': BreakSignal,
+    '_Continue': ContinueSignal,
+}
+
+for _operation, _method_name in enumerate(OPERATION_METHODS):
+    if _operation != OP_DIV:
+        RUNTIME[f'_{_method_name}'] = make_operation(_operation)
+
+
+#######################################
+# TRANSPILER
+#######################################
+
+class Transpiler:
+    def __init__(self, fn='<program>'):
+        self.filename = f'<transpiled {fn}>'
+        self.namespace = dict(RUNTIME)
+        self.constant_names = {}
+        self.node_names = {}
+        self.temp_count = 0
+        self.definitions = []
+        self.definition_count = 0
+
+        self.lines = []
+        self.indent = 1
+        self.loop_depth = 0
+        self.is_function = False
+
+    def transpile(self, node):
+        self.lines = []
+        self.emit('symbols = context.symbol_table.symbols')
+        value = self.expression(node)
+        self.emit(f'return {value}')
+        self.definitions.append(('_program', self.lines))
+
+        source_lines = []
+        line_nodes = {}
+
+        for definition_name, lines in self.definitions:
+            source_lines.append(f'def {definition_name}(context):')
+
+            for indent, text, line_node in lines:
+                source_lines.append('    ' * indent + text)
+                line_nodes[len(source_lines)] = line_node
+
+        return '\n'.join(source_lines) + '\n', line_nodes
+
+    def run(self, node, context):
+        res = RTResult()
+
+        try:
+            source, line_nodes = self.transpile(node)
+            code = compile(source, self.filename, 'exec')
+        except (SyntaxError, RecursionError):
+            # Python caps how deeply blocks nest, such programs run on the closure engine
+            return ClosureCompiler().run(node, context)
+
+        exec(code, self.namespace)
+
+        try:
+            return res.success(self.namespace['_program'](context))
+        except ErrorSignal as signal:
+            return res.failure(signal.error)
+        except (BreakSignal, ContinueSignal):
+            return res.success(None)
+        except (RecursionError, ArithmeticError) as exception:
+            return res.failure(self.python_error(exception, line_nodes, context))
+
+    def python_error(self, exception, line_nodes, context):
+        # Map the innermost generated line back to the node it was emitted for
+        node = None
+        traceback = exception.__traceback__
+
+        while traceback:
+            if traceback.tb_frame.f_code.co_filename == self.filename:
+                line = traceback.tb_lineno
+
+                while line > 0 and line_nodes.get(line) is None:
+                    line -= 1
+
+                node = line_nodes.get(line, node)
+
+            traceback = traceback.tb_next
+
+        details = 'Maximum recursion depth exceeded' if isinstance(exception, RecursionError) else str(exception)
+
+        return RTError(node.start_position, node.end_position, details, context)
+
+    ###################################
+
+    def emit(self, text, node=None):
+        self.lines.append((self.indent, text, node))
+
+    def temp(self):
+        self.temp_count += 1
+        return f'_t{self.temp_count}'
+
+    def name_for(self, names, prefix, key, value):
+        if key not in names:
+            names[key] = f'{prefix}{len(names)}'
+            self.namespace[names[key]] = value
+
+        return names[key]
+
+    def constant(self, value):
+        return self.name_for(self.constant_names, '_c', (type(value), type(value.value), value.value), value)
+
+    def node_reference(self, node):
+        return self.name_for(self.node_names, '_n', id(node), node)
+
+    def is_trivial(self, expression):
+        return TRIVIAL.fullmatch(expression) is not None
+
+    def expressions(self, nodes):
+        # Python evaluates an expression left to right, but statements emitted for
+        # a later operand run before it, so earlier operands are spilled first
+        results = []
+
+        for node in nodes:
+            mark = len(self.lines)
+            expression = self.expression(node)
+
+            if len(self.lines) != mark:
+                for i, previous in enumerate(results):
+                    if not self.is_trivial(previous):
+                        temp = self.temp()
+                        self.lines.insert(mark, (self.indent, f'{temp} = {previous}', nodes[i]))
+                        mark += 1
+                        results[i] = temp
+
+            results.append(expression)
+
+        return results
+
+    def expression(self, node):
+        method_name = f'visit_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_visit_method)
+
+        return method(node)
+
+    def no_visit_method(self, node):
+        raise Exception(f'No visit_{type(node).__name__} method defined')
+
+    def discard(self, node):
+        if isinstance(node, ListNode):
+            for element_node in node.nodes:
+                self.discard(element_node)
+            return
+
+        expression = self.expression(node)
+
+        if not self.is_trivial(expression):
+            self.emit(expression, node)
+
+    def block(self, node, should_return_null, target=None):
+        # Emits a nested block, storing its value in target unless it is discarded
+        mark = len(self.lines)
+
+        if should_return_null:
+            self.discard(node)
+        else:
+            self.emit(f'{target} = {self.expression(node)}', node)
+
+        if len(self.lines) == mark:
+            self.emit('pass')
+
+    def contains_call(self, node):
+        if isinstance(node, CallNode):
+            return True
+
+        for value in vars(node).values():
+            children = value if isinstance(value, (list, tuple)) else [value]
+
+            for child in children:
+                parts = child if isinstance(child, tuple) else [child]
+
+                if any(hasattr(part, 'start_position') and self.contains_call(part) for part in parts):
+                    return True
+
+        return False
+
+    def loop_body(self, body_node, should_return_null, results):
+        # Calls may BREAK or CONTINUE out of a function into this loop
+        guarded = self.contains_call(body_node)
+
+        if guarded:
+            self.emit('try:')
+            self.indent += 1
+
+        self.loop_depth += 1
+
+        if should_return_null:
+            self.block(body_node, True)
+        else:
+            value = self.temp()
+            self.block(body_node, False, value)
+            self.emit(f'{results}.append({value})')
+
+        self.loop_depth -= 1
+
+        if guarded:
+            self.indent -= 1
+            self.emit('except _Continue:')
+            self.emit('    continue')
+            self.emit('except _Break:')
+            self.emit('    break')
+
+    ###################################
+
+    def visit_ListNode(self, node):
+        return f'List([{", ".join(self.expressions(node.nodes))}])'
+
+    def visit_NumberNode(self, node):
+        return self.constant(node.value)
+
+    def visit_StringNode(self, node):
+        return self.constant(String(node.token.value))
+
+    def visit_BinaryOperationNode(self, node):
+        left, right = self.expressions([node.left_node, node.right_node])
+        method_name = OPERATION_METHODS[node.operation]
+        helper = '_divide' if method_name == 'dived_by' else f'_{method_name}'
+
+        return f'{helper}({left}, {right}, {self.node_reference(node)}, context)'
+
+    def visit_UnaryOperationNode(self, node):
+        value = self.expression(node.node)
+
+        if node.op_token.type == MINUS:
+            return f'_negative({value}, {self.node_reference(node)}, context)'
+
+        return f'_notted({value})'
+
+    def visit_VarAccessNode(self, node):
+        var_name = repr(node.var_name_token.value)
+
+        return f'(symbols.get({var_name}) or _load(context, {var_name}, {self.node_reference(node)}))'
+
+    def visit_VarAssignNode(self, node):
+        value = self.expression(node.value_node)
+        temp = self.temp()
+        self.emit(f'{temp} = symbols[{node.var_name_token.value!r}] = {value}', node)
+
+        return temp
+
+    def visit_IfNode(self, node):
+        result = self.temp()
+        depth = 0
+
+        for condition, expr, should_return_null in node.cases:
+            mark = len(self.lines)
+            condition_value = self.expression(condition)
+            keyword = 'elif' if depth and len(self.lines) == mark else 'if'
+
+            if keyword == 'elif':
+                self.indent -= 1
+            elif depth:
+                # The condition needed statements of its own, so it opens a nested if
+                # in an else. Those statements are already indented as its body
+                self.lines[mark:mark] = [(self.indent - 1, 'else:', None)]
+                depth += 1
+
+            self.emit(f'{keyword} ({condition_value}).is_true():', condition)
+            self.indent += 1
+            self.block(expr, should_return_null, result)
+
+            if should_return_null:
+                self.emit(f'{result} = _null')
+
+            depth = max(depth, 1)
+
+        self.indent -= 1
+        self.emit('else:')
+        self.indent += 1
+
+        if node.else_case:
+            expr, should_return_null = node.else_case
+            self.block(expr, should_return_null, result)
+
+            if should_return_null:
+                self.emit(f'{result} = _null')
+        else:
+            self.emit(f'{result} = _null')
+
+        self.indent -= depth
+
+        return result
+
+    def visit_WhileNode(self, node):
+        results = None if node.should_return_null else self.temp()
+
+        if results:
+            self.emit(f'{results} = []')
+
+        self.emit('while True:')
+        self.indent += 1
+        condition_value = self.expression(node.condition_node)
+        self.emit(f'if not ({condition_value}).is_true():', node.condition_node)
+        self.emit('    break')
+        self.loop_body(node.body_node, node.should_return_null, results)
+        self.indent -= 1
+
+        return f'List({results})' if results else '_null'
+
+    def visit_ForNode(self, node):
+        value_nodes = [node.start_value_node, node.end_value_node]
+
+        if node.step_value_node:
+            value_nodes.append(node.step_value_node)
+
+        values = self.expressions(value_nodes)
+
+        if not node.step_value_node:
+            values.append(self.constant(Number(1)))
+
+        start_value, end_value, step_value = values
+        results = None if node.should_return_null else self.temp()
+        counter = self.temp()
+
+        if results:
+            self.emit(f'{results} = []')
+
+        self.emit(f'for {counter} in _range({start_value}.value, {end_value}.value, {step_value}.value):', node)
+        self.indent += 1
+        self.emit(f'symbols[{node.var_name_token.value!r}] = _number({counter})')
+        self.loop_body(node.body_node, node.should_return_null, results)
+        self.indent -= 1
+
+        return f'List({results})' if results else '_null'
+
+    def visit_ContinueNode(self, node):
+        self.emit('continue' if self.loop_depth else 'raise _Continue()', node)
+
+        return '_null'
+
+    def visit_BreakNode(self, node):
+        self.emit('break' if self.loop_depth else 'raise _Break()', node)
+
+        return '_null'
+
+    def visit_FuncDefinitionNode(self, node):
+        func_name = node.var_name_token.value if node.var_name_token else None
+        arguments_names = [arguments_name.value for arguments_name in node.arguments_name_tokens]
+        self.definition_count += 1
+        definition_name = f'_f{self.definition_count}'
+
+        outer = self.lines, self.indent, self.loop_depth, self.is_function
+        self.lines, self.indent, self.loop_depth, self.is_function = [], 1, 0, True
+
+        self.emit('symbols = context.symbol_table.symbols')
+
+        if node.should_auto_return:
+            self.emit(f'return {self.expression(node.body_node)}', node.body_node)
+        else:
+            self.discard(node.body_node)
+            self.emit('return _null')
+
+        self.definitions.append((definition_name, self.lines))
+        self.lines, self.indent, self.loop_depth, self.is_function = outer
+
+        temp = self.temp()
+        self.emit(
+            f'{temp} = _make_function({func_name!r}, {definition_name}, {arguments_names!r}, '
+            f'{node.should_auto_return!r}, {self.node_reference(node.body_node)}, context, '
+            f'{self.node_reference(node)})',
+            node
+        )
+
+        if func_name:
+            self.emit(f'symbols[{func_name!r}] = {temp}')
+
+        return temp
+
+    def visit_CallNode(self, node):
+        values = self.expressions([node.node_to_call] + node.arguments_nodes)
+
+        return f'_call({values[0]}, [{", ".join(values[1:])}], context, {self.node_reference(node)})'
+
+    def visit_ReturnNode(self, node):
+        if node.node_to_return and self.is_function:
+            self.emit(f'return {self.expression(node.node_to_return)}', node)
+        else:
+            if node.node_to_return:
+                self.discard(node.node_to_return)
+
+            self.emit('return _null' if self.is_function else 'return None', node)
+
+        return '_null'
@@ -0,0 +1,389 @@
+from BaseFunction import BaseFunction
+from Bytecode import LOAD_CONST, LOAD_LOCAL, STORE_LOCAL, LOAD_NAME, STORE_NAME, POP, BINARY_OPERATION, \
+    UNARY_NEGATIVE, UNARY_NOT, BUILD_LIST, JUMP, POP_JUMP_IF_FALSE, FOR_PREPARE, FOR_ITERATE, RESULTS_INIT, \
+    RESULTS_APPEND, RESULTS_LOAD, MAKE_FUNCTION, CALL, RETURN, UNWIND_LOOP
+from Context import Context
+from Errors import RTError
+from List import List
+from Memoize import MemoizedFunction, memo_key
+from Number import Number, make_number
+from Operations import OP_DIV, OPERATION_METHODS, NUMBER_OPERATIONS, operation_error, negation_error
+from RTResult import RTResult
+from Signals import ErrorSignal, BreakSignal, ContinueSignal
+from String import String
+
+
+class Frame:
+    def __init__(self, code, parent, context):
+        self.code = code
+        self.parent = parent
+        self.root = parent.root if parent else self
+        self.context = context
+        self.locals = [None] * code.local_count
+
+        # Value stack and resume position while a callee runs
+        self.stack = None
+        self.pc = 0
+
+        # Where the result goes when the frame runs a memoized function
+        self.cache = None
+        self.memo_key = None
+
+    # A frame stands in for the SymbolTable of its context, so callees
+    # resolving names through the caller chain see its local slots
+
+    def get(self, name):
+        # Iterative, the caller chain is as long as the script recursion
+        frame = self
+
+        while type(frame) is Frame:
+            slot = frame.code.local_index.get(name)
+
+            if slot is not None and frame.locals[slot] is not None:
+                return frame.locals[slot]
+
+            frame = frame.parent
+
+        return frame.get(name) if frame else None
+
+    def set(self, name, value):
+        self.locals[self.code.local_index[name]] = value
+
+
+class CompiledFunction(BaseFunction):
+    def __init__(self, code):
+        super().__init__(code.name)
+        self.code = code
+
+    def execute(self, arguments):
+        res = RTResult()
+
+        res.register(self.check_arguments(self.code.arguments_names, arguments))
+
+        if res.should_return():
+            return res
+
+        execute_context = Context(self.name, self.context, self.start_position)
+        frame = Frame(self.code, self.context.symbol_table, execute_context)
+        execute_context.symbol_table = frame
+        frame.locals[:len(arguments)] = arguments
+
+        try:
+            return VirtualMachine().run_frame(frame)
+        except BreakSignal:
+            return res.success_break()
+        except ContinueSignal:
+            return res.success_continue()
+
+    def copy(self):
+        copy = CompiledFunction(self.code)
+        copy.set_context(self.context)
+        copy.set_position(self.start_position, self.end_position)
+
+        return copy
+
+    def __repr__(self):
+        return f"<function {self.name}>"
+
+
+class VirtualMachine:
+    def run(self, code, context):
+        try:
+            return self.run_frame(Frame(code, context.symbol_table, context))
+        except (BreakSignal, ContinueSignal):
+            return RTResult().success(None)
+
+    def run_frame(self, frame):
+        res = RTResult()
+
+        try:
+            value = self.execute_frame(frame)
+        except ErrorSignal as signal:
+            return res.failure(signal.error)
+
+        return res.success(value)
+
+    def execute_frame(self, frame):
+        # Calls between compiled functions push frames on this list instead of
+        # recursing, so script recursion is bounded by max_depth only
+        frames = []
+
+        code = frame.code
+        instructions = code.instructions
+        constants = code.constants
+        local_vars = frame.locals
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+
+        while True:
+            op = instructions[pc]
+            argument = instructions[pc + 1]
+            pc += 2
+
+            if op == LOAD_LOCAL:
+                value = local_vars[argument]
+
+                if value is None:
+                    value = self.load_name(frame, code.local_names[argument], pc - 2)
+
+                push(value)
+
+            elif op == LOAD_CONST:
+                push(constants[argument])
+
+            elif op == BINARY_OPERATION:
+                right = pop()
+                left = stack[-1]
+
+                if type(left) is Number and type(right) is Number and (argument != OP_DIV or right.value != 0):
+                    stack[-1] = make_number(NUMBER_OPERATIONS[argument](left.value, right.value))
+                else:
+                    stack[-1] = self.binary_operation(frame, pc - 2, argument, left, right)
+
+            elif op == STORE_LOCAL:
+                local_vars[argument] = stack[-1]
+
+            elif op == POP:
+                del stack[-argument:]
+
+            elif op == POP_JUMP_IF_FALSE:
+                if not pop().is_true():
+                    pc = argument
+
+            elif op == JUMP:
+                pc = argument
+
+            elif op == FOR_ITERATE:
+                i = local_vars[argument]
+
+                if (i < local_vars[argument + 1]) if local_vars[argument + 2] >= 0 else (i > local_vars[argument + 1]):
+                    push(make_number(i))
+                    local_vars[argument] = i + local_vars[argument + 2]
+                    pc += 1
+                else:
+                    pc = instructions[pc]
+
+            elif op == CALL:
+                if argument:
+                    arguments = stack[-argument:]
+                    del stack[-argument:]
+                else:
+                    arguments = []
+
+                value_to_call = stack[-1]
+                cache, key = None, None
+
+                # A memoized compiled function gets a frame here too, its result is cached on RETURN
+                if type(value_to_call) is MemoizedFunction and type(value_to_call.function) is CompiledFunction and \
+                        len(arguments) == len(value_to_call.function.code.arguments_names):
+                    if value_to_call.is_pure(frame.context.shadowed_names):
+                        key = memo_key(arguments)
+
+                    if key is not None:
+                        value = value_to_call.cache.get(key)
+
+                        if value is not None:
+                            stack[-1] = value
+                            continue
+
+                        cache = value_to_call.cache
+
+                    value_to_call = value_to_call.function
+
+                if type(value_to_call) is not CompiledFunction or \
+                        len(arguments) != len(value_to_call.code.arguments_names):
+                    stack[-1] = self.call(frame, pc - 2, value_to_call, arguments)
+                    continue
+
+                if len(frames) >= self.max_depth:
+                    raise ErrorSignal(self.depth_error(frame, pc - 2))
+
+                execute_context = Context(value_to_call.name, frame.context, code.nodes[pc - 2].start_position)
+                callee_frame = Frame(value_to_call.code, frame.context.symbol_table, execute_context)
+                execute_context.symbol_table = callee_frame
+                callee_frame.locals[:argument] = arguments
+                callee_frame.cache, callee_frame.memo_key = cache, key
+
+                stack.pop()
+                frame.stack = stack
+                frame.pc = pc
+                frames.append(frame)
+
+                frame = callee_frame
+                code = frame.code
+                instructions = code.instructions
+                constants = code.constants
+                local_vars = frame.locals
+                stack = []
+                push = stack.append
+                pop = stack.pop
+                pc = 0
+
+            elif op == LOAD_NAME:
+                push(self.load_name(frame, constants[argument], pc - 2))
+
+            elif op == STORE_NAME:
+                frame.parent.set(constants[argument], stack[-1])
+
+            elif op == RESULTS_APPEND:
+                local_vars[argument].append(pop())
+
+            elif op == RETURN:
+                value = pop()
+
+                # A cached List would be shared by every caller and could be mutated by any of them
+                if frame.cache is not None and type(value) in (Number, String):
+                    frame.cache.put(frame.memo_key, value)
+
+                if not frames:
+                    return value
+
+                frame = frames.pop()
+                code = frame.code
+                instructions = code.instructions
+                constants = code.constants
+                local_vars = frame.locals
+                stack = frame.stack
+                push = stack.append
+                pop = stack.pop
+                pc = frame.pc
+
+                push(value)
+
+            elif op == RESULTS_INIT:
+                local_vars[argument] = []
+
+            elif op == RESULTS_LOAD:
+                push(List(local_vars[argument]))
+
+            elif op == FOR_PREPARE:
+                step_value = pop()
+                end_value = pop()
+                start_value = pop()
+                local_vars[argument] = start_value.value
+                local_vars[argument + 1] = end_value.value
+                local_vars[argument + 2] = step_value.value
+
+            elif op == BUILD_LIST:
+                if argument:
+                    elements = stack[-argument:]
+                    del stack[-argument:]
+                else:
+                    elements = []
+
+                push(List(elements))
+
+            elif op == UNARY_NEGATIVE:
+                value = stack[-1]
+
+                if type(value) is Number:
+                    stack[-1] = make_number(-value.value)
+                else:
+                    stack[-1] = self.negate(frame, pc - 2, value)
+
+            elif op == UNARY_NOT:
+                value, _ = stack[-1].notted()
+                stack[-1] = value
+
+            elif op == MAKE_FUNCTION:
+                push(CompiledFunction(constants[argument]))
+
+            elif op == UNWIND_LOOP:
+                # Leave callee frames until a call made from inside a loop
+                handler = None
+
+                while handler is None:
+                    if not frames:
+                        raise ContinueSignal() if argument else BreakSignal()
+
+                    frame = frames.pop()
+                    handler = frame.code.loop_handlers.get(frame.pc - 2)
+
+                break_target, continue_target, depth = handler
+
+                code = frame.code
+                instructions = code.instructions
+                constants = code.constants
+                local_vars = frame.locals
+                stack = frame.stack
+                push = stack.append
+                pop = stack.pop
+                pc = continue_target if argument else break_target
+
+                del stack[depth:]
+
+            else:
+                raise Exception(f'Unknown opcode {op}')
+
+    ###################################
+
+    def load_name(self, frame, name, pc):
+        if name not in frame.context.shadowed_names:
+            value = frame.root.symbols.get(name)
+        else:
+            value = frame.parent.get(name) if frame.parent else None
+
+        if value is None:
+            node = frame.code.nodes[pc]
+
+            raise ErrorSignal(RTError(
+                node.start_position, node.end_position,
+                f"'{name}' is not defined",
+                frame.context
+            ))
+
+        return value
+
+    def binary_operation(self, frame, pc, operation, left, right):
+        node = frame.code.nodes[pc]
+        cache = node.cache
+
+        if type(left) is cache.left_type and type(right) is cache.right_type:
+            result, error = cache.handler(left, right)
+        else:
+            result, error = cache.miss(left, right)
+
+        if error:
+            raise ErrorSignal(operation_error(node, frame.context, OPERATION_METHODS[operation], left, right))
+
+        return result
+
+    def negate(self, frame, pc, value):
+        result, error = value.multed_by(Number(-1))
+
+        if error:
+            raise ErrorSignal(negation_error(frame.code.nodes[pc], frame.context, value))
+
+        return result
+
+    def depth_error(self, frame, pc):
+        node = frame.code.nodes[pc]
+
+        return RTError(
+            node.start_position, node.end_position,
+            'Maximum recursion depth exceeded',
+            frame.context
+        )
+
+    def call(self, frame, pc, value_to_call, arguments):
+        # Builtins, and compiled functions called with the wrong number of arguments
+        node = frame.code.nodes[pc]
+        value_to_call = value_to_call.copy().set_position(node.start_position, node.end_position)
+        value_to_call.set_context(frame.context)
+
+        # A function run here starts a VirtualMachine of its own on the Python stack
+        try:
+            res = value_to_call.execute(arguments)
+        except RecursionError:
+            raise ErrorSignal(self.depth_error(frame, pc))
+
+        if res.error:
+            raise ErrorSignal(res.error)
+
+        return Number.null if res.value is None else res.value
+
+
+# Deepest chain of compiled function calls before a run fails with an RTError
+VirtualMachine.max_depth = 20000